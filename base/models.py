@@ -2,14 +2,118 @@ import string
 import random
 
 from django.db import models
+from django.db.models import Q
 from django.core.exceptions import ValidationError
 
 
+class ChangedFieldsMixin:
+    """
+    Keep track of which fields of a model have changed since
+    the object was loaded from the database.
+
+    When an object that exists in the database is saved without
+    ``update_fields``, only the changed fields are written.
+    """
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._store_loaded_values()
+        return instance
+
+    def _store_loaded_values(self, fields=None):
+        if not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__ and (fields is None or field.name in fields
+                                                    or field.attname in fields):
+                self._loaded_values[field.attname] = self.__dict__[field.attname]
+
+    def get_changed_fields(self):
+        """
+        Return a set with the names of the fields that have changed since
+        the object was loaded from the database.
+
+        If the object hasn't been saved, or it wasn't loaded from the
+        database, all fields are considered changed.
+        """
+        fields = [field for field in self._meta.concrete_fields if not field.primary_key]
+
+        if self._state.adding or not hasattr(self, '_loaded_values'):
+            return {field.name for field in fields}
+
+        return {field.name for field in fields
+                if field.attname in self.__dict__
+                and (field.attname not in self._loaded_values
+                     or self.__dict__[field.attname] != self._loaded_values[field.attname])}
+
+    def has_changed(self, name):
+        """
+        Return whether the field with the given name has changed since
+        the object was loaded from the database.
+
+        If the object wasn't loaded from the database the stored value
+        is fetched to compare against.
+        """
+        field = self._meta.get_field(name)
+
+        if self._state.adding:
+            return True
+        if field.attname in getattr(self, '_loaded_values', {}):
+            return getattr(self, field.attname) != self._loaded_values[field.attname]
+
+        stored = type(self)._default_manager.filter(pk=self.pk)\
+                                            .values_list(field.attname, flat=True)
+        return list(stored) != [getattr(self, field.attname)]
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using, fields)
+        self._store_loaded_values(fields)
+
+    def save(self, *args, **kwargs):
+        if (not args and kwargs.get('update_fields') is None and not kwargs.get('force_insert')
+                and not self._state.adding and hasattr(self, '_loaded_values')):
+            kwargs['update_fields'] = self.get_changed_fields()
+
+        super().save(*args, **kwargs)
+        self._store_loaded_values(kwargs.get('update_fields'))
+
+
+class PeriodQuerySet(models.QuerySet):
+    """
+    Filter :model:`base.Period` by how they relate to a date or a range of dates.
+
+    Like ``Period.contains()``, a period includes its start date but not its
+    end date, and a period without an end date has not ended.
+    """
+    def contains(self, day):
+        """Return the periods that contain the given date."""
+        return self.filter(Q(end=None) | Q(end__gt=day), start__lte=day)
+
+    def overlaps(self, start, end):
+        """Return the periods that overlap the range from ``start`` up to ``end``."""
+        return self.filter(Q(end=None) | Q(end__gt=start), start__lt=end)
+
+    def within(self, start, end):
+        """
+        Return the periods that both start and end within the range
+        from ``start`` to ``end``, inclusive.
+        """
+        return self.filter(start__gte=start, end__lte=end)
+
+
 class Period(models.Model):
-    """Store a period of time."""
+    """
+    Store a period of time.
+
+    The default manager supports the queries in :model:`base.PeriodQuerySet`.
+    Concrete periods should index ``start`` and ``end`` together, to support them.
+    """
     start = models.DateField('start')
     end = models.DateField('slutt', null=True, blank=True)
 
+    objects = PeriodQuerySet.as_manager()
+
     class Meta:
         abstract = True
         verbose_name = 'periode'
@@ -21,6 +21,19 @@ INTERNAL_IPS = ['localhost', '127.0.0.1']
 
 MEDIA_ROOT = 'media-root/'
 
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+# Permissions and other data are cached between requests. In production
+# the cache must be shared by all processes, e.g. by using memcached, or
+# `python manage.py check --deploy` fails:
+#
+# CACHES = {
+#     'default': {
+#         'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+#         'LOCATION': '127.0.0.1:11211',
+#     }
+# }
+
 # Email backend
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
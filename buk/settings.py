@@ -93,6 +93,7 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 AUTH_USER_MODEL = 'members.Member'
+AUTHENTICATION_BACKENDS = ['members.backends.CachedPermissionBackend']
 LOGIN_URL = urls.reverse_lazy('login')
 LOGIN_REDIRECT_URL = urls.reverse_lazy('front_page')
 LOGOUT_REDIRECT_URL = urls.reverse_lazy('login')
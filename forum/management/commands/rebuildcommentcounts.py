@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from forum.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Counts the comments of every forum post again, and fixes the stored counts.'
+
+    def handle(self, *args, **options):
+        Post.rebuild_comment_counts()
+        self.stdout.write('Rebuilt the comment counts')
@@ -0,0 +1,25 @@
+# Generated by Django 2.1.5 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0008_auto_20181229_0003'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='post',
+            options={'ordering': ('-last_activity', '-created', '-pk'), 'permissions': (('view_board_forum', 'Kan se styreforumet'),), 'verbose_name': 'forumpost', 'verbose_name_plural': 'forumposter'},
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['forum', 'last_activity', 'created'], name='forum_post_forum_4fa9a9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['last_activity', 'created'], name='forum_post_last_ac_6ccbf9_idx'),
+        ),
+    ]
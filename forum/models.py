@@ -1,5 +1,7 @@
 from django.urls import reverse
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 
 from base.models import BaseComment
 from members.models import Member
@@ -15,6 +17,9 @@ class Post(models.Model):
     last_activity timestamp is updated when the post
     is changed, or a comment is posted.
 
+    comment_count is updated when a comment is posted or deleted,
+    and can be rebuilt with the ``rebuildcommentcounts`` command.
+
     Access to the board forum is restricted by permission.
     """
     # The names in the constants are used in the database and urls,
@@ -36,11 +41,17 @@ class Post(models.Model):
     poll = models.OneToOneField(Poll, null=True, on_delete=models.SET_NULL)
     created = models.DateTimeField(auto_now_add=True)
     last_activity = models.DateTimeField(auto_now=True)
+    comment_count = models.IntegerField('antall kommentarer', default=0, editable=False)
 
     class Meta:
         verbose_name = 'forumpost'
         verbose_name_plural = 'forumposter'
-        ordering = ('-last_activity', '-created')
+        ordering = ('-last_activity', '-created', '-pk')
+        indexes = [
+            # Match the ordering, for the post lists of each forum and of all forums
+            models.Index(fields=['forum', 'last_activity', 'created']),
+            models.Index(fields=['last_activity', 'created']),
+        ]
         permissions = (
             ('view_board_forum', 'Kan se styreforumet'),
         )
@@ -52,6 +63,16 @@ class Post(models.Model):
     def get_absolute_url(self):
         return reverse('forum_post_detail', kwargs={'pk': self.pk, 'forum': self.forum})
 
+    @classmethod
+    def rebuild_comment_counts(cls):
+        """Count the comments of every post again, in one UPDATE."""
+        comments = ForumComment.objects.filter(post=OuterRef('pk'))\
+                                       .order_by()\
+                                       .values('post')\
+                                       .annotate(count=Count('*'))\
+                                       .values('count')
+        cls.objects.update(comment_count=Coalesce(Subquery(comments), Value(0)))
+
     @classmethod
     def user_can_access_forum(cls, user, forum):
         """Return whether or not the user can access the forum."""
@@ -78,11 +99,18 @@ class ForumComment(BaseComment):
 
     def save(self, *args, **kwargs):
         """
-        Save the comment to the database, and update
-        the last_activity timestamp on the related
-        :model:`forum.Post`.
+        Save the comment to the database, and if the comment
+        is new, update the last_activity timestamp and the
+        comment_count of the related :model:`forum.Post`.
+
+        The post is changed with a single UPDATE of those columns.
+        Editing a comment doesn't change the post.
         """
+        adding = self._state.adding
         super(ForumComment, self).save(*args, **kwargs)
-        post = self.post
-        post.last_activity = self.created
-        post.save()
+
+        if adding:
+            Post.objects.filter(pk=self.post_id).update(
+                last_activity=self.created,
+                comment_count=F('comment_count') + 1,
+            )
@@ -0,0 +1,85 @@
+"""
+Page through :model:`forum.Post` and :model:`forum.ForumComment` newest
+first, with a cursor instead of an offset.
+
+The cursor holds the sort key of the last object on a page, and the next
+page starts right after it, so every page is one query on the index of the
+sort order, however far into the list it is.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+PAGE_SIZE = 25
+COMMENT_PAGE_SIZE = 50
+
+# The orderings of the pages, which must end with a unique field
+POST_ORDERING = ('-last_activity', '-created', '-pk')
+COMMENT_ORDERING = ('-created', '-pk')
+
+
+def get_field_names(ordering):
+    return [name.lstrip('-') for name in ordering]
+
+
+def encode_cursor(obj, ordering=POST_ORDERING):
+    """Return the cursor of the page after the given object."""
+    key = []
+    for name in get_field_names(ordering):
+        value = getattr(obj, name)
+        key.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor, model, ordering=POST_ORDERING):
+    """
+    Return the values of the fields of the ordering in a cursor.
+
+    Raise ValueError if the cursor is invalid.
+    """
+    names = get_field_names(ordering)
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(key, list) or len(key) != len(names):
+            raise ValueError
+        fields = [model._meta.pk if name == 'pk' else model._meta.get_field(name)
+                  for name in names]
+        values = [field.to_python(value) if value is not None else None
+                  for field, value in zip(fields, key)]
+    except (TypeError, ValueError, UnicodeError, ValidationError):
+        raise ValueError('Ugyldig side')
+
+    if None in values:
+        raise ValueError('Ugyldig side')
+    return values
+
+
+def get_page(queryset, cursor=None, size=PAGE_SIZE, ordering=POST_ORDERING):
+    """
+    Return a list of the objects in the queryset after the cursor, or the
+    first objects if the cursor is None, and the cursor of the next page,
+    or None if this is the last page.
+
+    Raise ValueError if the cursor is invalid.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, ordering)
+        names = get_field_names(ordering)
+
+        # Everything after the cursor is equal up to some field, and after it in that field
+        after = Q()
+        for i, name in enumerate(names):
+            lookup = '__lt' if ordering[i].startswith('-') else '__gt'
+            after |= Q(**dict(zip(names[:i], values[:i])), **{name + lookup: values[i]})
+        queryset = queryset.filter(after)
+
+    # Fetch one more than the page size, to know if there is a next page
+    objects = list(queryset[:size + 1])
+    if len(objects) > size:
+        objects = objects[:size]
+        return objects, encode_cursor(objects[-1], ordering)
+    return objects, None
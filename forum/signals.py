@@ -0,0 +1,11 @@
+from django.db.models import F
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Post, ForumComment
+
+
+@receiver(post_delete, sender=ForumComment)
+def update_comment_count(sender, instance, **kwargs):
+    # Also sent when comments are deleted with their poster
+    Post.objects.filter(pk=instance.post_id).update(comment_count=F('comment_count') - 1)
@@ -0,0 +1,18 @@
+$(document).ready(function() {
+    $('.load-more').click(function(event) {
+        event.preventDefault();
+        var button = $(this);
+
+        $.getJSON(button.data('url'), function(data) {
+            $('table.posts').append(data.html);
+
+            if (data.next) {
+                button.data('url', data.next);
+            } else {
+                button.remove();
+            }
+        }).fail(function() {
+            alert('Det har oppstått en feil. Ta kontakt med webkom.');
+        });
+    });
+});
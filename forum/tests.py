@@ -1,9 +1,15 @@
-from datetime import date
+from datetime import date, timedelta
+from io import StringIO
 
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import Permission
+from django.utils import timezone
 
-from .models import Post
+from . import pagination
+from .models import Post, ForumComment
 from members.models import Member, Instrument, BoardPosition
 from django.urls import reverse
 
@@ -104,3 +110,173 @@ class PostListTestCase(TestCase):
         response = self.client.get(reverse('all_forum_post_list'))
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'testpost')
+
+
+class PostPaginationTestCase(TestCase):
+    def setUp(self):
+        test_member['instrument'] = Instrument.objects.create(name='Testolin')
+        self.member = Member.objects.create_user(**test_member)
+        self.client.force_login(self.member)
+
+        now = timezone.now()
+        for i in range(30):
+            post = Post.objects.create(title=f'Post {i}', poster=self.member)
+            # Some posts have the same timestamps, and are ordered by primary key
+            Post.objects.filter(pk=post.pk).update(last_activity=now - timedelta(hours=i // 3),
+                                                   created=now - timedelta(days=1))
+        self.order = list(Post.objects.values_list('pk', flat=True))
+
+    def test_get_page(self):
+        posts, cursor = pagination.get_page(Post.objects.all(), size=20)
+        self.assertEqual([post.pk for post in posts], self.order[:20])
+
+        with self.assertNumQueries(1):
+            posts, cursor = pagination.get_page(Post.objects.all(), cursor, size=20)
+        self.assertEqual([post.pk for post in posts], self.order[20:])
+        self.assertIsNone(cursor)
+
+    def test_invalid_cursor(self):
+        for cursor in ['abc', 'W10=', 'WzEsIDIsIDNd']:
+            with self.assertRaises(ValueError):
+                pagination.get_page(Post.objects.all(), cursor)
+
+        response = self.client.get(reverse('forum_post_list', args=['diverse']), {'after': 'abc'})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('all_forum_post_list_more'), {'after': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_list(self):
+        response = self.client.get(reverse('forum_post_list', args=['diverse']))
+        self.assertEqual([post.pk for post in response.context['posts']],
+                         self.order[:pagination.PAGE_SIZE])
+        self.assertIsNotNone(response.context['more_url'])
+
+        response = self.client.get(response.context['more_url'])
+        data = response.json()
+        self.assertIsNone(data['next'])
+        self.assertIn('Post 29', data['html'])
+        self.assertNotIn('postet i', data['html'])
+
+        response = self.client.get(reverse('forum_post_list_more', args=['musikk']))
+        data = response.json()
+        self.assertEqual(data['html'].strip(), '')
+        self.assertIsNone(data['next'])
+
+    def test_all_post_list(self):
+        response = self.client.get(reverse('all_forum_post_list'))
+        self.assertContains(response, 'Vis flere')
+
+        response = self.client.get(reverse('all_forum_post_list') + response.context['next_page_url'])
+        self.assertEqual([post.pk for post in response.context['posts']],
+                         self.order[pagination.PAGE_SIZE:])
+        self.assertNotContains(response, 'Vis flere')
+
+
+class CommentCountTestCase(TestCase):
+    def setUp(self):
+        test_member['instrument'] = Instrument.objects.create(name='Testolin')
+        self.member = Member.objects.create_user(**test_member)
+        self.post = Post.objects.create(title='testpost', content='x' * 1000)
+
+    def get_post(self):
+        return Post.objects.get(pk=self.post.pk)
+
+    def test_comment_created(self):
+        with CaptureQueriesContext(connection) as queries:
+            comment = ForumComment.objects.create(post=self.post, poster=self.member,
+                                                  comment='Kommentar')
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"content"', updates[0])
+
+        post = self.get_post()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(post.last_activity, comment.created)
+
+        # Changing a comment doesn't count it again, or move the last activity back
+        later = ForumComment.objects.create(post=self.post, poster=self.member, comment='Senere')
+        comment.comment = 'Endret'
+        comment.save()
+        post = self.get_post()
+        self.assertEqual(post.comment_count, 2)
+        self.assertEqual(post.last_activity, later.created)
+
+    def test_comment_deleted(self):
+        comments = [ForumComment.objects.create(post=self.post, poster=self.member, comment='K')
+                    for i in range(3)]
+        comments[0].delete()
+        self.assertEqual(self.get_post().comment_count, 2)
+
+        self.member.delete()
+        self.assertEqual(self.get_post().comment_count, 0)
+
+    def test_rebuild(self):
+        for i in range(3):
+            ForumComment.objects.create(post=self.post, poster=self.member, comment='K')
+        other = Post.objects.create(title='other')
+        Post.objects.update(comment_count=10)
+
+        call_command('rebuildcommentcounts', stdout=StringIO())
+        self.assertEqual(self.get_post().comment_count, 3)
+        self.assertEqual(Post.objects.get(pk=other.pk).comment_count, 0)
+
+
+class PostCommentsTestCase(TestCase):
+    def setUp(self):
+        test_member['instrument'] = Instrument.objects.create(name='Testolin')
+        self.member = Member.objects.create_user(**test_member)
+        self.client.force_login(self.member)
+        self.post = Post.objects.create(title='testpost')
+
+        size = pagination.COMMENT_PAGE_SIZE
+        now = timezone.now()
+        ForumComment.objects.bulk_create([
+            ForumComment(post=self.post, poster=self.member, comment=f'Kommentar {i}')
+            for i in range(size * 2 + 5)
+        ])
+        # Some comments have the same timestamp, and are ordered by primary key
+        for i, comment in enumerate(ForumComment.objects.order_by('pk')):
+            ForumComment.objects.filter(pk=comment.pk).update(created=now + timedelta(minutes=i // 2))
+        self.order = list(ForumComment.objects.order_by('created', 'pk')
+                                              .values_list('pk', flat=True))
+
+    def test_newest_page(self):
+        url = self.post.get_absolute_url()
+        # Warm up the permission cache
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual([comment.pk for comment in response.context['comments']],
+                         self.order[-pagination.COMMENT_PAGE_SIZE:])
+        comment_queries = [query for query in queries
+                           if 'FROM "forum_forumcomment"' in query['sql']]
+        self.assertEqual(len(comment_queries), 1)
+        self.assertIn('"members_member"', comment_queries[0]['sql'])
+
+    def test_older_pages(self):
+        size = pagination.COMMENT_PAGE_SIZE
+        response = self.client.get(self.post.get_absolute_url())
+        url = response.context['older_comments_url']
+
+        data = self.client.get(url).json()
+        html = data['html']
+        self.assertLess(html.index('Kommentar %d\n' % (len(self.order) - size * 2)),
+                        html.index('Kommentar %d\n' % (len(self.order) - size - 1)))
+        self.assertIsNotNone(data['next'])
+
+        data = self.client.get(data['next']).json()
+        self.assertIn('Kommentar 0\n', data['html'])
+        self.assertIn('Kommentar 4\n', data['html'])
+        self.assertNotIn('Kommentar 5\n', data['html'])
+        self.assertIsNone(data['next'])
+
+    def test_invalid_cursor(self):
+        url = reverse('forum_post_comments', kwargs={'forum': self.post.forum, 'pk': self.post.pk})
+        response = self.client.get(url, {'after': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+        other = Post.objects.create(title='other', forum=Post.MUSIC)
+        response = self.client.get(reverse('forum_post_comments',
+                                           kwargs={'forum': Post.VARIOUS, 'pk': other.pk}))
+        self.assertEqual(response.status_code, 404)
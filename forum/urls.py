@@ -1,13 +1,18 @@
 from django.urls import path
 
-from .views import PostCreate, PostUpdate, PostDetail, PostList, AllPostList
+from .views import (PostCreate, PostUpdate, PostDetail, PostComments, PostList,
+                    PostListMore, AllPostList, AllPostListMore)
 
 urlpatterns = [
     path('', AllPostList.as_view(), name='all_forum_post_list'),
+    path('mer', AllPostListMore.as_view(), name='all_forum_post_list_more'),
     path('<forum>/', PostList.as_view(), name='forum_post_list'),
+    path('<forum>/mer', PostListMore.as_view(), name='forum_post_list_more'),
     path('<forum>/ny', PostCreate.as_view(), name='forum_post_create'),
     path('<forum>/<int:pk>', PostDetail.as_view(),
          name='forum_post_detail'),
+    path('<forum>/<int:pk>/kommentarer', PostComments.as_view(),
+         name='forum_post_comments'),
     path('<forum>/<int:pk>/endre', PostUpdate.as_view(),
          name='forum_post_update'),
 ]
@@ -1,5 +1,8 @@
-from django.http import Http404
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
+from django.views.generic import View
 from django.views.generic.detail import SingleObjectMixin
 from django.views.generic.list import ListView
 from django.contrib.auth.mixins import UserPassesTestMixin
@@ -8,6 +11,7 @@ from django.urls import reverse
 from utils.views import MultiFormView
 from polls.views import PollCreateFormView, PollAnswerFormView
 
+from . import pagination
 from .models import Post
 from .forms import PostForm, ForumCommentForm
 
@@ -73,6 +77,25 @@ class PostUpdate(UserCanAccessForumMixin, SingleObjectMixin, PollCreateFormView,
         return super().get_context_data(**kwargs)
 
 
+def get_comment_page(post, cursor=None):
+    """
+    Return a list of the comments of the post after the cursor, newest first,
+    and the cursor of the page of older comments, or None.
+    """
+    return pagination.get_page(post.comments.select_related('poster'), cursor,
+                               size=pagination.COMMENT_PAGE_SIZE,
+                               ordering=pagination.COMMENT_ORDERING)
+
+
+def get_older_comments_url(post, cursor):
+    """Return the URL of the page of older comments, or None if there are none."""
+    if cursor is None:
+        return None
+    return '{}?{}'.format(
+        reverse('forum_post_comments', kwargs={'forum': post.forum, 'pk': post.pk}),
+        urlencode({'after': cursor}))
+
+
 class PostDetail(UserCanAccessForumMixin, PollAnswerFormView):
     model = Post
     context_object_name = 'post'
@@ -90,6 +113,12 @@ class PostDetail(UserCanAccessForumMixin, PollAnswerFormView):
     def get_context_data(self, **kwargs):
         self.object = self.get_object()
         context = super().get_context_data(**kwargs)
+
+        # The newest comments are shown, oldest first, and the older are loaded on demand
+        comments, cursor = get_comment_page(self.object)
+        context['comments'] = comments[::-1]
+        context['older_comments_url'] = get_older_comments_url(self.object, cursor)
+
         prev = self.request.GET.get('prev')
         if prev:
             context['back_link'] = reverse(prev)
@@ -99,14 +128,143 @@ class PostDetail(UserCanAccessForumMixin, PollAnswerFormView):
         return context
 
 
-class PostList(UserCanAccessForumMixin, ListView):
+class PostComments(UserCanAccessForumMixin, SingleObjectMixin, View):
+    """
+    Return a page of older comments of a post as JSON, for :view:`forum.views.PostDetail`.
+
+    **GET parameters**
+
+    ``after``
+        The cursor of the page, from ``next`` of the previous page.
+
+    **Result**
+
+    ``html``
+        The comments, rendered oldest first.
+
+    ``next``
+        The URL of the page of comments older than these, or ``null``
+        if these are the oldest.
+    """
+    model = Post
+
+    def get(self, request, *args, **kwargs):
+        post = self.get_object()
+        try:
+            comments, cursor = get_comment_page(post, request.GET.get('after'))
+        except ValueError as e:
+            return JsonResponse({'errors': {'after': [str(e)]}}, status=400)
+
+        return JsonResponse({
+            'html': render_to_string('forum/comment_list_items.html', {
+                'comments': comments[::-1],
+            }, request=request),
+            'next': get_older_comments_url(post, cursor),
+        })
+
+
+class PostPageMixin:
+    """
+    Show a page of the posts from ``get_posts()``, which defaults to all
+    posts, paged by ``forum.pagination``.
+
+    The cursor of the page is given by the GET parameter ``after``, and
+    ``more_url_name`` is the name of the URL that returns the next page as JSON.
+    """
+    more_url_name = None
+    show_forum = False
+
+    def get_posts(self):
+        return Post.objects.all()
+
+    def get_url_args(self):
+        return []
+
+    def get_page(self):
+        """
+        Return the posts on the page, and the cursor of the next page,
+        or None. Raise ValueError if the cursor is invalid.
+        """
+        return pagination.get_page(self.get_posts().select_related('poster'),
+                                   self.request.GET.get('after'))
+
+    def get_more_url(self, cursor):
+        """Return the URL of the next page as JSON, or None if there is no next page."""
+        if cursor is None:
+            return None
+        return '{}?{}'.format(reverse(self.more_url_name, args=self.get_url_args()),
+                              urlencode({'after': cursor}))
+
+
+class PostPageJson(PostPageMixin, View):
+    """
+    Return a page of posts as JSON, for the "load more" button of the post lists.
+
+    **Result**
+
+    ``html``
+        The posts, rendered as rows of the post list.
+
+    ``next``
+        The URL of the next page, or ``null`` if this is the last one.
+    """
+    def get(self, request, *args, **kwargs):
+        try:
+            posts, cursor = self.get_page()
+        except ValueError as e:
+            return JsonResponse({'errors': {'after': [str(e)]}}, status=400)
+
+        return JsonResponse({
+            'html': render_to_string('forum/post_list_items.html', {
+                'posts': posts,
+                'show_forum': self.show_forum,
+            }, request=request),
+            'next': self.get_more_url(cursor),
+        })
+
+
+class PostPageListView(PostPageMixin, ListView):
+    """A list of the first page of posts, or the page after the cursor in ``after``."""
     model = Post
     context_object_name = 'posts'
 
     def get_queryset(self):
+        try:
+            posts, self.cursor = self.get_page()
+        except ValueError as e:
+            raise Http404(str(e))
+        return posts
+
+    def get_context_data(self, *args, **kwargs):
+        context = super(PostPageListView, self).get_context_data(*args, **kwargs)
+        context['show_forum'] = self.show_forum
+        context['more_url'] = self.get_more_url(self.cursor)
+        if self.cursor is not None:
+            context['next_page_url'] = '?' + urlencode({'after': self.cursor})
+        return context
+
+
+class ForumPostsMixin:
+    """Page through the posts of the forum in the URL."""
+    more_url_name = 'forum_post_list_more'
+
+    def get_posts(self):
         kwargs = self.request.resolver_match.kwargs
         self.forum = kwargs['forum'] if 'forum' in kwargs else Post.VARIOUS
-        return Post.objects.filter(forum=self.forum).prefetch_related('poster')
+        return Post.objects.filter(forum=self.forum)
+
+    def get_url_args(self):
+        return [self.forum]
+
+
+class AllPostsMixin:
+    """Page through the posts of all forums."""
+    more_url_name = 'all_forum_post_list_more'
+    show_forum = True
+
+
+class PostList(UserCanAccessForumMixin, ForumPostsMixin, PostPageListView):
+    template_name = 'forum/post_list.html'
 
     def get_context_data(self, *args, **kwargs):
         context = super(PostList, self).get_context_data(*args, **kwargs)
@@ -122,13 +280,12 @@ class PostList(UserCanAccessForumMixin, ListView):
         return context
 
 
-class AllPostList(UserCanAccessForumMixin, ListView):
-    model = Post
-    context_object_name = 'posts'
-    template_name = 'forum/all_post_list.html'
+class PostListMore(UserCanAccessForumMixin, ForumPostsMixin, PostPageJson):
+    pass
 
-    def get_queryset(self):
-        return Post.objects.all().prefetch_related('poster')
+
+class AllPostList(UserCanAccessForumMixin, AllPostsMixin, PostPageListView):
+    template_name = 'forum/all_post_list.html'
 
     def get_context_data(self, *args, **kwargs):
         context = super(AllPostList, self).get_context_data(*args, **kwargs)
@@ -138,3 +295,7 @@ class AllPostList(UserCanAccessForumMixin, ListView):
         context['new_post_url'] = reverse('forum_post_create', args=['diverse'])
 
         return context
+
+
+class AllPostListMore(UserCanAccessForumMixin, AllPostsMixin, PostPageJson):
+    pass
@@ -6,4 +6,5 @@ class MembersConfig(AppConfig):
     verbose_name = 'medlemmer'
 
     def ready(self):
+        import members.checks
         import members.signals
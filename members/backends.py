@@ -0,0 +1,50 @@
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from utils.cache import bump_version_on_commit, can_cache, versioned_key
+
+PERMISSION_CACHE = 'members.permissions'
+PERMISSION_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class CachedPermissionBackend(ModelBackend):
+    """
+    Authenticate members like the standard ``ModelBackend``, but cache
+    the permissions of each member across requests.
+
+    The cached permissions are shared by every request through the
+    default cache, so checking permissions doesn't query the database
+    unless the permissions have changed. Any change to the permissions
+    of a member, or of the groups they are in, must call
+    ``invalidate_permission_cache()``, which is done by the signals in
+    ``members.signals``.
+
+    Permissions read inside a transaction are not cached, since the
+    transaction could be rolled back. The cache must be shared between
+    all processes serving the site, which is checked by
+    ``members.checks``, or some processes will keep stale permissions.
+    """
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+
+        if not hasattr(user_obj, '_perm_cache'):
+            key = versioned_key(PERMISSION_CACHE, user_obj.pk, user_obj.is_superuser)
+            permissions = cache.get(key)
+
+            if permissions is None:
+                permissions = super().get_all_permissions(user_obj)
+                if can_cache():
+                    cache.set(key, permissions, PERMISSION_CACHE_TIMEOUT)
+
+            user_obj._perm_cache = permissions
+
+        return user_obj._perm_cache
+
+
+def invalidate_permission_cache():
+    """
+    Invalidate the cached permissions of all members, for the current
+    transaction and when it is committed.
+    """
+    bump_version_on_commit(PERMISSION_CACHE)
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+
+# Cache backends that keep a separate cache in every process
+PROCESS_CACHES = (LocMemCache,)
+
+
+@register(Tags.caches, deploy=True)
+def check_permission_cache(app_configs, **kwargs):
+    """
+    Check that the permissions cached by ``CachedPermissionBackend`` are
+    shared between processes, since a change to the permissions only
+    invalidates the cache of the process that made it.
+    """
+    if 'members.backends.CachedPermissionBackend' not in settings.AUTHENTICATION_BACKENDS:
+        return []
+
+    if isinstance(caches['default'], PROCESS_CACHES):
+        return [Error(
+            'CachedPermissionBackend is used with a cache that is not shared between processes.',
+            hint="Set CACHES['default'] to a shared cache, like memcached.",
+            obj='members.backends.CachedPermissionBackend',
+            id='members.E001',
+        )]
+    return []
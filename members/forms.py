@@ -1,9 +1,13 @@
+from datetime import date
+
 from django.contrib.auth.forms import AuthenticationForm, PasswordResetForm
 from django import forms
 
 from base.forms import BasePeriodFormset
 
-from .models import Member, MembershipPeriod, LeavePeriod, Committee, CommitteeMembership
+from .models import (Member, MembershipPeriod, LeavePeriod, Committee, CommitteeMembership,
+                     Instrument, PercussionGroup)
+from .statistics import count_buckets
 
 
 class MemberAuthenticationForm(AuthenticationForm):
@@ -80,6 +84,81 @@ class MemberStatisticsForm(forms.Form):
             label='Medlemmer i permisjon i løpet av perioden', label_suffix='', required=False)
 
 
+class MemberHeadcountForm(forms.Form):
+    INTERVALS = (
+        ('day', 'Dag'),
+        ('week', 'Uke'),
+        ('month', 'Måned'),
+    )
+
+    MAX_BUCKETS = 1000
+
+    start = forms.DateField(label='Start', required=True)
+    end = forms.DateField(label='Slutt', required=True)
+    interval = forms.ChoiceField(label='Intervall', choices=INTERVALS, required=False)
+
+    def clean_end(self):
+        end = self.cleaned_data['end']
+        # The buckets are counted up to the day after the end
+        if end.year >= date.max.year:
+            raise forms.ValidationError('Slutten må være før år %d.' % date.max.year)
+        return end
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start = cleaned_data.get('start')
+        end = cleaned_data.get('end')
+        cleaned_data['interval'] = cleaned_data.get('interval') or 'month'
+
+        if start and end:
+            if start > end:
+                raise forms.ValidationError('Slutten kan ikke være før starten.')
+            if count_buckets(start, end, cleaned_data['interval']) > self.MAX_BUCKETS:
+                raise forms.ValidationError(
+                    'Perioden kan ikke deles i mer enn %d intervaller.' % self.MAX_BUCKETS)
+
+        return cleaned_data
+
+
+class MemberApiForm(forms.Form):
+    """Validate the parameters of :view:`members.views.MemberApi`."""
+    FIELDS = ('id', 'first_name', 'last_name', 'email', 'phone', 'instrument',
+              'percussion_group', 'is_active', 'is_on_leave', 'birthday',
+              'address', 'zip_code', 'city')
+    DEFAULT_FIELDS = ('id', 'first_name', 'last_name', 'phone', 'instrument')
+    STATUSES = (
+        ('active', 'Aktive'),
+        ('on_leave', 'I permisjon'),
+        ('quit', 'Sluttet'),
+        ('all', 'Alle'),
+    )
+    MAX_LIMIT = 500
+
+    after = forms.IntegerField(required=False, min_value=0)
+    limit = forms.IntegerField(required=False, min_value=1, max_value=MAX_LIMIT)
+    fields = forms.CharField(required=False)
+    instrument = forms.ModelChoiceField(Instrument.objects.all(), required=False)
+    percussion_group = forms.ModelChoiceField(PercussionGroup.objects.all(), required=False)
+    status = forms.ChoiceField(choices=STATUSES, required=False)
+
+    def clean_fields(self):
+        fields = self.cleaned_data['fields']
+        if not fields:
+            return list(self.DEFAULT_FIELDS)
+
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+        invalid = [field for field in fields if field not in self.FIELDS]
+        if invalid:
+            raise forms.ValidationError('Ugyldige felter: %s' % ', '.join(invalid))
+        return fields
+
+    def clean_limit(self):
+        return self.cleaned_data['limit'] or 100
+
+    def clean_status(self):
+        return self.cleaned_data['status'] or 'active'
+
+
 class CommitteeChangeForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -151,6 +151,10 @@ class MembershipPeriodImport(LegacyImporter):
             return members[0]
         raise ImportSkipRow()
 
+    def execute(self):
+        super().execute()
+        Member.objects.update_status()
+
 
 class LeavePeriodImport(LegacyImporter):
     dependiencies = [MemberImport]
@@ -176,6 +180,10 @@ class LeavePeriodImport(LegacyImporter):
             return members[0]
         raise ImportSkipRow()
 
+    def execute(self):
+        super().execute()
+        Member.objects.update_status()
+
 
 class BoardPositionImport(LegacyImporter):
     dependencies = [MemberImport]
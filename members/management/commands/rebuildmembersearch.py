@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from members import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index of members from scratch.'
+
+    def handle(self, *args, **options):
+        if not search.is_indexed():
+            self.stdout.write('The database has no search index')
+            return
+
+        search.rebuild_index()
+        self.stdout.write('Rebuilt the search index')
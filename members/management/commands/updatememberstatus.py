@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from members.models import Member
+
+
+class Command(BaseCommand):
+    help = ('Recomputes whether members are active or on leave from their membership '
+            'and leave periods. Should be run daily, as periods can end in the future.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            dest='date',
+            help='Compute the status at the given date (YYYY-MM-DD) instead of today.',
+        )
+
+    def handle(self, *args, **options):
+        day = None
+        if options['date']:
+            try:
+                day = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Invalid date %s' % options['date'])
+
+        count = Member.objects.update_status(day)
+        self.stdout.write('Updated the status of %d members' % count)
@@ -0,0 +1,31 @@
+"""
+The cache of the rendered sections of the member list.
+
+Each section lists the members of one :model:`members.Instrument`, and is
+cached for each combination of ``show_all`` and whether the user can
+change members. It is invalidated by ``invalidate_member_list_cache()``,
+which is called by the signals in ``members.signals`` and by
+``Member.objects.update_status()``.
+"""
+from utils.cache import bump_version_on_commit, versioned_key
+
+
+MEMBER_LIST_CACHE = 'members.member_list'
+MEMBER_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+
+# The fields of a member that are shown in the member list
+MEMBER_LIST_FIELDS = {'first_name', 'last_name', 'phone', 'instrument',
+                      'is_active', 'is_on_leave'}
+
+
+def get_section_key(instrument, show_all, can_change):
+    """Return the cache key of the section of an instrument."""
+    return versioned_key(MEMBER_LIST_CACHE, instrument.pk, show_all, can_change)
+
+
+def invalidate_member_list_cache():
+    """
+    Invalidate the cached sections of the member list, for the current
+    transaction and when it is committed.
+    """
+    bump_version_on_commit(MEMBER_LIST_CACHE)
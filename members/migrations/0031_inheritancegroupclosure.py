@@ -0,0 +1,57 @@
+# Generated by Django 2.1.5 on 2026-10-18 10:50
+
+from collections import defaultdict
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_closure(apps, schema_editor):
+    InheritanceGroup = apps.get_model('members', 'InheritanceGroup')
+    InheritanceGroupClosure = apps.get_model('members', 'InheritanceGroupClosure')
+
+    parents = defaultdict(set)
+    edges = InheritanceGroup.parents.through.objects.values_list(
+        'from_inheritancegroup', 'to_inheritancegroup')
+    for child, parent in edges:
+        parents[child].add(parent)
+
+    rows = []
+    for group in InheritanceGroup.objects.values_list('pk', flat=True):
+        ancestors = set()
+        stack = list(parents[group])
+        while stack:
+            ancestor = stack.pop()
+            if ancestor not in ancestors:
+                ancestors.add(ancestor)
+                stack.extend(parents[ancestor])
+
+        ancestors.discard(group)
+        rows += [InheritanceGroupClosure(ancestor_id=ancestor, descendant_id=group)
+                 for ancestor in ancestors]
+
+    InheritanceGroupClosure.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0030_merge_20190123_1554'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InheritanceGroupClosure',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='members.InheritanceGroup')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='members.InheritanceGroup')),
+            ],
+            options={
+                'verbose_name': 'gruppearv',
+                'verbose_name_plural': 'gruppearv',
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
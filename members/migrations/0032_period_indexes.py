@@ -0,0 +1,29 @@
+# Generated by Django 2.1.5 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0031_inheritancegroupclosure'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaveperiod',
+            index=models.Index(fields=['start', 'end'], name='members_lea_start_be5440_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaveperiod',
+            index=models.Index(fields=['member', 'start', 'end'], name='members_lea_member__334a8c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membershipperiod',
+            index=models.Index(fields=['start', 'end'], name='members_mem_start_ac7b06_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membershipperiod',
+            index=models.Index(fields=['member', 'start', 'end'], name='members_mem_member__055f99_idx'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 2.1.5 on 2026-10-18 13:05
+
+from django.db import DatabaseError, migrations, transaction
+
+
+def create_trigram_extension(schema_editor):
+    """
+    Create the pg_trgm extension, unless it is already installed, and return
+    whether it is installed. Creating it needs a superuser on PostgreSQL 9.6,
+    so if the database user can't, the search is done without it.
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone():
+            return True
+
+    try:
+        with transaction.atomic(using=connection.alias):
+            schema_editor.execute('CREATE EXTENSION pg_trgm')
+    except DatabaseError:
+        return False
+    return True
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE members_member_search '
+            'USING fts5(name, email, instrument, other, '
+            'tokenize="unicode61 remove_diacritics 0")')
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE members_member_search ('
+            '  member_id integer PRIMARY KEY REFERENCES members_member (id) '
+            '    ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,'
+            '  name text NOT NULL,'
+            '  document tsvector NOT NULL)')
+        schema_editor.execute(
+            'CREATE INDEX members_member_search_document '
+            'ON members_member_search USING gin (document)')
+        if create_trigram_extension(schema_editor):
+            schema_editor.execute(
+                'CREATE INDEX members_member_search_name '
+                'ON members_member_search USING gin (name gin_trgm_ops)')
+    else:
+        return
+
+    Member = apps.get_model('members', 'Member')
+    for member in Member.objects.select_related('instrument').order_by().iterator():
+        name = '%s %s' % (member.first_name, member.last_name)
+        other = ' '.join([member.city, member.occupation, member.about_me])
+        if vendor == 'sqlite':
+            schema_editor.execute(
+                'INSERT INTO members_member_search (rowid, name, email, instrument, other) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                [member.pk, name, member.email, member.instrument.name, other])
+        else:
+            schema_editor.execute(
+                "INSERT INTO members_member_search (member_id, name, document) "
+                "VALUES (%s, %s, "
+                "  setweight(to_tsvector('simple', %s), 'A') || "
+                "  setweight(to_tsvector('simple', %s || ' ' || %s), 'B') || "
+                "  setweight(to_tsvector('simple', %s), 'C'))",
+                [member.pk, name, name, member.email, member.instrument.name, other])
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE members_member_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0032_period_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
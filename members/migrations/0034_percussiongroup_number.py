@@ -0,0 +1,52 @@
+# Generated by Django 2.1.5 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+def number_groups(apps, schema_editor):
+    PercussionGroup = apps.get_model('members', 'PercussionGroup')
+    for number, group in enumerate(PercussionGroup.objects.order_by('pk'), 1):
+        group.number = number
+        group.save(update_fields=['number'])
+
+
+def name_groups(apps, schema_editor):
+    PercussionGroup = apps.get_model('members', 'PercussionGroup')
+    for group in PercussionGroup.objects.all():
+        group.name = 'Gruppe {}'.format(group.number)
+        group.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0033_member_search'),
+    ]
+
+    operations = [
+        # Allow the name to be empty, so it can be filled in again when reversed
+        migrations.AlterField(
+            model_name='percussiongroup',
+            name='name',
+            field=models.CharField(editable=False, max_length=50, null=True, unique=True, verbose_name='navn'),
+        ),
+        migrations.AlterModelOptions(
+            name='percussiongroup',
+            options={'ordering': ('number', 'pk'), 'permissions': (('change_percussion_group', 'Kan endre slagverkbæregrupper'),), 'verbose_name': 'slagverkbæregruppe', 'verbose_name_plural': 'slagverkbæregrupper'},
+        ),
+        migrations.AddField(
+            model_name='percussiongroup',
+            name='number',
+            field=models.PositiveIntegerField(db_index=True, editable=False, null=True, verbose_name='nummer'),
+        ),
+        migrations.RunPython(number_groups, name_groups),
+        migrations.AlterField(
+            model_name='percussiongroup',
+            name='number',
+            field=models.PositiveIntegerField(db_index=True, editable=False, verbose_name='nummer'),
+        ),
+        migrations.RemoveField(
+            model_name='percussiongroup',
+            name='name',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.1.5 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0034_percussiongroup_number'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='percussiongroup',
+            name='number',
+            field=models.PositiveIntegerField(editable=False, unique=True, verbose_name='nummer'),
+        ),
+    ]
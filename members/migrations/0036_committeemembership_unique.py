@@ -0,0 +1,28 @@
+# Generated by Django 2.1.5 on 2026-10-18 16:20
+
+from django.db import migrations
+from django.db.models import Min
+
+
+def remove_duplicates(apps, schema_editor):
+    """Keep only the first membership of each member in each committee."""
+    CommitteeMembership = apps.get_model('members', 'CommitteeMembership')
+    first = (CommitteeMembership.objects.values('committee', 'member')
+                                        .annotate(first=Min('pk'))
+                                        .values_list('first', flat=True))
+    CommitteeMembership.objects.exclude(pk__in=list(first)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0035_percussiongroup_number_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='committeemembership',
+            unique_together={('committee', 'member')},
+        ),
+    ]
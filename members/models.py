@@ -1,10 +1,16 @@
-from django.db import models
+import threading
+from collections import defaultdict
+from datetime import date
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q, F, Case, When, Exists, OuterRef
 from django.urls import reverse
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.contrib.auth.models import (BaseUserManager, AbstractBaseUser,
                                         PermissionsMixin, Group, Permission)
 
-from base.models import Period
+from base.models import Period, ChangedFieldsMixin
+from .memberlist import invalidate_member_list_cache
 
 
 class InheritanceGroup(Group):
@@ -38,33 +44,68 @@ class InheritanceGroup(Group):
 
     def update_permissions(self):
         """Update the permissions of this and all sub groups."""
-        permissions = list(self.own_permissions.all())
+        InheritanceGroup.propagate_permissions([self.pk])
 
-        for parent in self.parents.all():
-            permissions += list(parent.permissions.all())
+    @classmethod
+    def propagate_permissions(cls, groups):
+        """
+        Update the permissions of the given groups, and all groups
+        that inherit from them.
 
-        self.permissions.set(permissions)
+        The permissions of a group are its own permissions, and the own
+        permissions of every group it inherits from. These are computed
+        for all the groups at once, and only the permissions that were
+        added or removed are written to the database.
 
-        for sub in self.sub_groups.all():
-            sub.update_permissions()
+        ``groups`` is an iterable of primary keys.
+        """
+        groups = set(groups)
+        groups.update(InheritanceGroupClosure.objects.filter(ancestor__in=groups)
+                                                     .values_list('descendant', flat=True))
+        if not groups:
+            return
+
+        # The groups whose own permissions each group should have
+        sources = {group: {group} for group in groups}
+        links = InheritanceGroupClosure.objects.filter(descendant__in=groups)\
+                                               .values_list('ancestor', 'descendant')
+        for ancestor, descendant in links:
+            sources[descendant].add(ancestor)
+
+        own_permissions = defaultdict(set)
+        rows = cls.own_permissions.through.objects\
+                  .filter(inheritancegroup__in=set().union(*sources.values()))\
+                  .values_list('inheritancegroup', 'permission')
+        for group, permission in rows:
+            own_permissions[group].add(permission)
+
+        through = Group.permissions.through
+        current = defaultdict(dict)
+        rows = through.objects.filter(group__in=groups).values_list('pk', 'group', 'permission')
+        for pk, group, permission in rows:
+            current[group][permission] = pk
+
+        added = []
+        removed = []
+        for group in groups:
+            permissions = set().union(*(own_permissions[source] for source in sources[group]))
+            added += [through(group_id=group, permission_id=permission)
+                      for permission in permissions.difference(current[group])]
+            removed += [pk for permission, pk in current[group].items()
+                        if permission not in permissions]
+
+        if added or removed:
+            with transaction.atomic():
+                through.objects.filter(pk__in=removed).delete()
+                through.objects.bulk_create(added)
 
     def get_sub_groups(self):
         """Return a queryset of all groups that inherits from this group."""
-        subs = self.sub_groups.all()
-
-        for sub in self.sub_groups.all():
-            subs = subs.union(sub.get_sub_groups())
-
-        return subs
+        return InheritanceGroup.objects.filter(ancestor_links__ancestor=self)
 
     def get_all_parents(self):
         """Return a queryset of all groups that this group inherits from."""
-        parents = self.parents.all()
-
-        for parent in self.parents.all():
-            parents = parents.union(parent.get_all_parents())
-
-        return parents
+        return InheritanceGroup.objects.filter(descendant_links__descendant=self)
 
     def get_available_parents(self):
         """
@@ -73,11 +114,83 @@ class InheritanceGroup(Group):
         This excludes any group that inherits from this group, as that would
         cause a circular dependency.
         """
-        parents = InheritanceGroup.objects.exclude(pk=self.pk)
-        for sub in self.get_sub_groups():
-            parents = parents.exclude(pk=sub.pk)
+        return InheritanceGroup.objects\
+                               .exclude(pk=self.pk)\
+                               .exclude(ancestor_links__ancestor=self)
+
+    def inherits_from(self, group):
+        """Return whether this group inherits from the given group, directly or indirectly."""
+        return self.ancestor_links.filter(ancestor=group).exists()
+
+
+class InheritanceGroupClosure(models.Model):
+    """
+    Store the transitive closure of the inheritance between
+    :model:`members.InheritanceGroup`.
+
+    There is one row for every pair of groups where ``descendant``
+    inherits from ``ancestor``, either directly or through other groups.
+    This lets the ancestors or descendants of a group be found with a
+    single query, no matter how deep the hierarchy is.
+
+    The rows are kept up to date by signals when the ``parents`` field
+    of a group changes, and should not be altered manually.
+    """
+    ancestor = models.ForeignKey(
+        InheritanceGroup,
+        on_delete=models.CASCADE,
+        related_name='descendant_links',
+    )
+    descendant = models.ForeignKey(
+        InheritanceGroup,
+        on_delete=models.CASCADE,
+        related_name='ancestor_links',
+    )
+
+    class Meta:
+        verbose_name = 'gruppearv'
+        verbose_name_plural = 'gruppearv'
+        unique_together = ('ancestor', 'descendant')
+
+    def __str__(self):
+        return '%s -> %s' % (self.ancestor_id, self.descendant_id)
+
+    @classmethod
+    def rebuild(cls, groups):
+        """
+        Recompute the ancestors of the given groups, and of all groups
+        that inherit from them, from the ``parents`` field.
 
-        return parents
+        ``groups`` is an iterable of primary keys.
+        """
+        groups = set(groups)
+        groups.update(cls.objects.filter(ancestor__in=groups)
+                                 .values_list('descendant', flat=True))
+        if not groups:
+            return
+
+        parents = defaultdict(set)
+        edges = InheritanceGroup.parents.through.objects.values_list(
+            'from_inheritancegroup', 'to_inheritancegroup')
+        for child, parent in edges:
+            parents[child].add(parent)
+
+        rows = []
+        for group in groups:
+            ancestors = set()
+            stack = list(parents[group])
+            while stack:
+                ancestor = stack.pop()
+                if ancestor not in ancestors:
+                    ancestors.add(ancestor)
+                    stack.extend(parents[ancestor])
+
+            ancestors.discard(group)
+            rows += [cls(ancestor_id=ancestor, descendant_id=group) for ancestor in ancestors]
+
+        with transaction.atomic():
+            cls.objects.filter(descendant__in=groups).delete()
+            cls.objects.bulk_create(rows)
 
 
 class Instrument(models.Model):
@@ -105,9 +218,52 @@ class Instrument(models.Model):
         return self.name
 
 
+class PercussionGroupQuerySet(models.QuerySet):
+    def roster(self):
+        """
+        Return the groups with their members, and the active members who
+        are not in any group, from two queries.
+
+        Each group gets a ``roster`` with its members, ordered by group
+        leader, whether the member is on leave, first name and last name,
+        in that order. Each member gets ``is_percussion_group_leader``.
+        Leaders are never counted as unassigned.
+
+        Return a tuple of the list of groups and the list of unassigned members.
+        """
+        groups = list(self)
+        by_pk = {}
+        for group in groups:
+            group.roster = []
+            by_pk[group.pk] = group
+        leaders = {group.leader_id for group in groups}
+
+        unassigned = []
+        members = Member.objects.filter(Q(percussion_group__in=self.values('pk')) |
+                                        Q(is_active=True, percussion_group=None))\
+                                .order_by('is_on_leave', 'first_name', 'last_name')
+        for member in members:
+            member.is_percussion_group_leader = member.pk in leaders
+            if member.percussion_group_id in by_pk:
+                by_pk[member.percussion_group_id].roster.append(member)
+            elif not member.is_percussion_group_leader:
+                unassigned.append(member)
+
+        for group in groups:
+            # The sort is stable, so the rest of the order is kept
+            group.roster.sort(key=lambda member: not member.is_percussion_group_leader)
+
+        return groups, unassigned
+
+
 class PercussionGroup(models.Model):
-    """Store a percussion carrying group."""
-    name = models.CharField('navn', max_length=50, unique=True, editable=False)
+    """
+    Store a percussion carrying group.
+
+    The groups are numbered from 1 and up, in the order they were created,
+    and are renumbered when a group is deleted to fill the gap.
+    """
+    number = models.PositiveIntegerField('nummer', unique=True, editable=False)
     leader = models.OneToOneField(
         'Member',
         on_delete=models.PROTECT,
@@ -116,17 +272,24 @@ class PercussionGroup(models.Model):
         verbose_name='gruppeleder',
     )
 
+    objects = PercussionGroupQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'slagverkbæregruppe'
         verbose_name_plural = 'slagverkbæregrupper'
         permissions = (
             ('change_percussion_group', 'Kan endre slagverkbæregrupper'),
         )
-        ordering = ('name',)
+        ordering = ('number', 'pk')
 
     def __str__(self):
         return self.name
 
+    @property
+    def name(self):
+        """Return the name of the group, on the form 'Gruppe <number>'."""
+        return 'Gruppe {}'.format(self.number)
+
     def ordered_members(self):
         """
         Return a list of members of the group ordered by group leader,
@@ -139,27 +302,172 @@ class PercussionGroup(models.Model):
         """
         Save the object to the database.
 
-        If the objects is new a name is generated for it, on the form 'Gruppe <num>'.
+        If the object is new it is given the number after the highest
+        existing number. The existing groups are locked while the number
+        is picked, so groups created at the same time get different numbers.
+        When there are no groups to lock, the unique number makes one of
+        them fail, and it picks the next number instead.
         """
-        if not self.name:
-            self.name = 'Gruppe {}'.format(PercussionGroup.objects.count() + 1)
+        if self.number is not None:
+            super(PercussionGroup, self).save(*args, **kwargs)
+            return
 
-        super(PercussionGroup, self).save(*args, **kwargs)
+        while True:
+            try:
+                with transaction.atomic():
+                    # The lock must be taken before reading the highest number,
+                    # so the number is read after any concurrent creation commits.
+                    list(PercussionGroup.objects.select_for_update().values_list('pk', flat=True))
+                    highest = PercussionGroup.objects.aggregate(models.Max('number'))
+                    self.number = (highest['number__max'] or 0) + 1
+                    super(PercussionGroup, self).save(*args, **kwargs)
+                return
+            except IntegrityError:
+                # Only retry if another group took the number
+                taken = PercussionGroup.objects.filter(number=self.number).exists()
+                self.number = None
+                if not taken:
+                    raise
+
+    @classmethod
+    def get_assignments(cls):
+        """
+        Return the current assignment of members to groups, in the format
+        taken by ``reassign()``.
+        """
+        groups = {pk: (leader, []) for pk, leader in cls.objects.values_list('pk', 'leader')}
+        for member, group in Member.objects.filter(percussion_group__isnull=False)\
+                                           .order_by()\
+                                           .values_list('pk', 'percussion_group'):
+            groups[group][1].append(member)
+        return groups
+
+    @classmethod
+    def reassign(cls, groups):
+        """
+        Assign all members to groups, and choose the leader of each group.
+
+        ``groups`` maps the primary key of each group to a tuple with the
+        primary key of its leader, or None, and a list of the primary keys
+        of its members. The leader is always a member of their group.
+        Groups that are not in the mapping get no members and no leader,
+        and members that are not in any group are removed from their group.
+
+        Everything is changed in one transaction, with one UPDATE for each
+        group that gets new members or a new leader. If the mapping is
+        invalid a ``ValidationError`` is raised and nothing is changed.
+
+        Return the changes, as a dict where ``members`` maps the primary
+        key of each moved member to a tuple of their old and new group, and
+        ``leaders`` maps the primary key of each group with a new leader
+        to a tuple of the old and new leader.
+        """
+        target = {}
+        for group, (leader, members) in groups.items():
+            for member in set(members) | ({leader} if leader else set()):
+                if target.setdefault(member, group) != group:
+                    raise ValidationError('Et medlem kan bare være med i én gruppe.')
+
+        with transaction.atomic():
+            leaders = dict(cls.objects.select_for_update().order_by().values_list('pk', 'leader'))
+            if set(groups) - set(leaders):
+                raise ValidationError('En av gruppene finnes ikke.')
+
+            current = dict(Member.objects.filter(Q(percussion_group__isnull=False) |
+                                                 Q(pk__in=target))
+                                         .order_by()
+                                         .values_list('pk', 'percussion_group'))
+            if set(target) - set(current):
+                raise ValidationError('Et av medlemmene finnes ikke.')
+
+            moved = {member: (group, target.get(member))
+                     for member, group in current.items() if group != target.get(member)}
+            new_leaders = {group: (leader, groups.get(group, (None, []))[0])
+                           for group, leader in leaders.items()}
+            new_leaders = {group: change for group, change in new_leaders.items()
+                           if change[0] != change[1]}
+
+            by_group = defaultdict(list)
+            for member, (old, new) in moved.items():
+                by_group[new].append(member)
+            for group, members in by_group.items():
+                Member.objects.filter(pk__in=members).update(percussion_group=group)
+
+            # A leader can only lead one group, so remove the old leaders
+            # before setting the new ones, in case a leader changes group.
+            if new_leaders:
+                cls.objects.filter(pk__in=new_leaders).update(leader=None)
+            for group, (old, new) in new_leaders.items():
+                if new is not None:
+                    cls.objects.filter(pk=group).update(leader=new)
+
+        return {'members': moved, 'leaders': new_leaders}
 
     def delete(self, *args, **kwargs):
-        """Delete the object, and rename other groups to fill the gap."""
-        pk = self.pk
-        prev = self.name
-        super(PercussionGroup, self).delete(*args, **kwargs)
+        """Delete the object, and renumber the later groups to fill the gap."""
+        with transaction.atomic():
+            list(PercussionGroup.objects.select_for_update().values_list('pk', flat=True))
+            # The number may have changed since the group was loaded
+            number = PercussionGroup.objects.values_list('number', flat=True).get(pk=self.pk)
+            result = super(PercussionGroup, self).delete(*args, **kwargs)
+
+            # The numbers are unique, and are checked for each row as it is
+            # updated, so the later groups are moved past the highest number
+            # before they are moved down.
+            later = PercussionGroup.objects.filter(number__gt=number)
+            highest = later.aggregate(highest=models.Max('number'))['highest']
+            if highest is not None:
+                later.update(number=models.F('number') + highest)
+                PercussionGroup.objects.filter(number__gt=highest)\
+                                       .update(number=models.F('number') - highest - 1)
+        return result
+
+
+class MemberQuerySet(models.QuerySet):
+    def update_status(self, day=None):
+        """
+        Recompute the ``is_active`` and ``is_on_leave`` fields of the members
+        from their :model:`members.MembershipPeriod` and
+        :model:`members.LeavePeriod`, using a single UPDATE.
+
+        A member is active if one of their membership periods contains the
+        given day, and on leave if one of their leave periods does. The
+        day defaults to today.
+
+        Inactive members are then removed from their percussion groups,
+        and as leaders of them. Return the number of members updated.
+
+        Admins and superusers keep their ``is_active``, so they can still
+        log in without a membership period. The UPDATE sends no signals, so
+        the member list cache is invalidated here.
+        """
+        day = day or date.today()
+
+        count = self.update(
+            is_active=Case(
+                When(Q(is_admin=True) | Q(is_superuser=True), then=F('is_active')),
+                default=Exists(MembershipPeriod.objects.contains(day).filter(member=OuterRef('pk'))),
+            ),
+            is_on_leave=Exists(LeavePeriod.objects.contains(day).filter(member=OuterRef('pk'))),
+        )
+
+        inactive = self.filter(is_active=False)
+        inactive.exclude(percussion_group=None).update(percussion_group=None)
+        PercussionGroup.objects.filter(leader__in=inactive).update(leader=None)
+
+        invalidate_member_list_cache()
+        return count
 
-        for group in PercussionGroup.objects.filter(pk__gt=pk):
-            tmp = group.name
-            group.name = prev
-            group.save()
-            prev = tmp
+    def active_on(self, day):
+        """Return the members that were active on the given date."""
+        return self.filter(pk__in=MembershipPeriod.objects.contains(day).values('member'))
 
+    def on_leave_on(self, day):
+        """Return the members that were on leave on the given date."""
+        return self.filter(pk__in=LeavePeriod.objects.contains(day).values('member'))
 
-class MemberManager(BaseUserManager):
+
+class MemberManager(BaseUserManager.from_queryset(MemberQuerySet)):
     def create_user(self, email, first_name, last_name, instrument, birthday,
                     phone, address, zip_code, city, password=None, joined_date=None):
         # Allow the instrument parameter to be an object, the primary key, or the name
@@ -204,12 +512,15 @@ class MemberManager(BaseUserManager):
         return user
 
 
-class Member(AbstractBaseUser, PermissionsMixin):
+class Member(ChangedFieldsMixin, AbstractBaseUser, PermissionsMixin):
     """
     Store a member.
 
     This replaces the standard user model, and uses
     :model:`members.MemberManager` as a custom manager.
+
+    Only the fields that have changed since the member was
+    loaded are written when it is saved.
     """
     email = models.EmailField(
         verbose_name='e-post',
@@ -263,18 +574,24 @@ class Member(AbstractBaseUser, PermissionsMixin):
         )
 
     def save(self, *args, **kwargs):
-        if self.pk:
-            prev = Member.objects.get(pk=self.pk)
-            if self.is_active != prev.is_active:
-                self.percussion_group = None
+        """
+        Save the member to the database.
 
-                try:
-                    group = self.percussion_group_leader_for
-                    if group:
-                        group.leader = None
-                        group.save()
-                except ObjectDoesNotExist:
-                    pass
+        If the member has quit or rejoined, they are removed from their
+        percussion group, and as the leader of it.
+        """
+        if not self._state.adding and self.has_changed('is_active'):
+            self.percussion_group = None
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'percussion_group'}
+
+            try:
+                group = self.percussion_group_leader_for
+                if group:
+                    group.leader = None
+                    group.save()
+            except ObjectDoesNotExist:
+                pass
 
         super(Member, self).save(*args, **kwargs)
 
@@ -344,6 +661,10 @@ class MembershipPeriod(Period):
     class Meta(Period.Meta):
         verbose_name = 'medlemskapsperiode'
         verbose_name_plural = 'medlemskapsperioder'
+        indexes = [
+            models.Index(fields=['start', 'end']),
+            models.Index(fields=['member', 'start', 'end']),
+        ]
 
     def save(self, *args, **kwargs):
         """
@@ -354,8 +675,8 @@ class MembershipPeriod(Period):
 
         member = self.member
 
-        # If there are open periods, i.e the member has not quit, the member is active
-        member.is_active = member.membership_periods.filter(end=None).exists()
+        # If a period contains today, i.e the member has not quit, the member is active
+        member.is_active = member.membership_periods.contains(date.today()).exists()
         member.save()
 
 
@@ -372,6 +693,10 @@ class LeavePeriod(Period):
     class Meta(Period.Meta):
         verbose_name = 'permisjonsperioder'
         verbose_name_plural = 'permisjonsperioder'
+        indexes = [
+            models.Index(fields=['start', 'end']),
+            models.Index(fields=['member', 'start', 'end']),
+        ]
 
     def save(self, *args, **kwargs):
         """
@@ -381,7 +706,7 @@ class LeavePeriod(Period):
         super(LeavePeriod, self).save(*args, **kwargs)
 
         member = self.member
-        member.is_on_leave = member.leave_periods.filter(end=None).exists()
+        member.is_on_leave = member.leave_periods.contains(date.today()).exists()
         member.save()
 
 
@@ -423,6 +748,10 @@ class BoardPosition(InheritanceGroup):
         self.user_set.set([self.holder])
 
 
+# The committees with changed members in the current transaction, per thread
+_pending_committees = threading.local()
+
+
 class Committee(InheritanceGroup):
     """Store a committee."""
     leader = models.ForeignKey(
@@ -476,22 +805,139 @@ class Committee(InheritanceGroup):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def sync_members(cls, committees):
+        """
+        Make the members of the groups of the given committees match the
+        members and leader of each committee.
+
+        Only the difference is written, with at most one DELETE and one
+        INSERT for all the committees. Committees that no longer exist are
+        skipped. Return whether any group membership was changed.
+        """
+        wanted = defaultdict(set)
+        committees = dict(cls.objects.filter(pk__in=committees).values_list('pk', 'leader'))
+        for committee, leader in committees.items():
+            if leader is not None:
+                wanted[committee].add(leader)
+        for committee, member in cls.members.through.objects\
+                                    .filter(committee__in=committees)\
+                                    .values_list('committee', 'member'):
+            wanted[committee].add(member)
+
+        through = Member.groups.through
+        current = set(through.objects.filter(group__in=committees)
+                                     .values_list('pk', 'group', 'member'))
+        wanted = {(committee, member) for committee, members in wanted.items()
+                  for member in members}
+        removed = [pk for pk, group, member in current if (group, member) not in wanted]
+        added = wanted - {(group, member) for pk, group, member in current}
+
+        if removed or added:
+            with transaction.atomic():
+                if removed:
+                    through.objects.filter(pk__in=removed).delete()
+                through.objects.bulk_create([through(group_id=committee, member_id=member)
+                                             for committee, member in added])
+
+        return bool(removed or added)
+
+    def schedule_sync(self):
+        """
+        Sync the members of the group of the committee when the current
+        transaction is committed, or right away if there is none.
+
+        The committees are collected until then, so changing many members
+        of a committee in one transaction syncs it once.
+        """
+        if not hasattr(_pending_committees, 'committees'):
+            _pending_committees.committees = set()
+        _pending_committees.committees.add(self.pk)
+
+        # Every call registers a callback, since the callbacks are dropped if
+        # the transaction is rolled back. The first callback syncs every committee.
+        transaction.on_commit(Committee.sync_pending)
+
+    @classmethod
+    def sync_pending(cls):
+        """Sync the committees scheduled with ``schedule_sync()``."""
+        committees = getattr(_pending_committees, 'committees', None)
+        if not committees:
+            return
+
+        # These can't be imported before the models are loaded
+        from .backends import invalidate_permission_cache
+        from .orgchart import invalidate_orgchart_cache
+
+        _pending_committees.committees = set()
+        invalidate_orgchart_cache()
+        if cls.sync_members(committees):
+            invalidate_permission_cache()
+
     def add_member(self, member, title=None):
-        attrs = {
-            'member': member,
-            'committee': self,
-        }
-        if title:
-            attrs['title'] = title
+        """Add a member to the committee. See ``add_members()``."""
+        self.add_members([member], title)
 
-        self.members.through.objects.create(**attrs)
+    def add_members(self, members, title=None):
+        """
+        Add the given members to the committee, all with the given title,
+        or the default title.
+
+        ``members`` can also be a dict mapping each member to their title.
+        Members who are already in the committee are skipped. The members
+        are added with one INSERT, and the group is synced once. If another
+        request adds some of the same members at the same time, the
+        unique membership makes the INSERT fail, and it is tried again
+        without them.
+
+        Return the new memberships.
+        """
+        if not isinstance(members, dict):
+            members = {member: title for member in members}
+
+        through = self.members.through
+        while True:
+            existing = set(through.objects.filter(committee=self, member__in=list(members))
+                                          .values_list('member', flat=True))
+
+            memberships = []
+            for member, member_title in members.items():
+                if member.pk not in existing:
+                    membership = through(committee=self, member=member)
+                    if member_title:
+                        membership.title = member_title
+                    memberships.append(membership)
+
+            if not memberships:
+                return memberships
+
+            try:
+                with transaction.atomic():
+                    through.objects.bulk_create(memberships)
+            except IntegrityError:
+                # Only retry if another request added some of the members
+                added = [membership.member_id for membership in memberships]
+                if not through.objects.filter(committee=self, member__in=added).exists():
+                    raise
+            else:
+                self.schedule_sync()
+                return memberships
 
     def remove_member(self, member):
-        self.members.through.objects.filter(member=member).delete()
+        """Remove a member from the committee. See ``remove_members()``."""
+        self.remove_members([member])
 
-    def add_members(self, members):
-        for member in members:
-            self.add_member(member)
+    def remove_members(self, members):
+        """
+        Remove the given members from the committee, and sync the group once.
+
+        Return the number of memberships removed.
+        """
+        count, _ = self.members.through.objects.filter(committee=self, member__in=members)\
+                                               .delete()
+        if count:
+            self.schedule_sync()
+        return count
 
     def member_titles(self):
         return self.members.through.objects.filter(committee=self)
@@ -517,3 +963,4 @@ class CommitteeMembership(models.Model):
     class Meta:
         verbose_name = 'komitemedlem'
         verbose_name_plural = 'komitemedlemmer'
+        unique_together = ('committee', 'member')
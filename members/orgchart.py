@@ -0,0 +1,81 @@
+"""
+A snapshot of the board and the committees, with their leaders and members.
+
+The snapshot only contains plain values, so it can be cached as a whole.
+It is invalidated by ``invalidate_orgchart_cache()``, which is called by
+the signals in ``members.signals`` and when the members of a committee are
+synced.
+"""
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from utils.cache import bump_version_on_commit, can_cache, versioned_key
+from .models import BoardPosition, Committee, CommitteeMembership
+
+
+ORGCHART_CACHE = 'members.orgchart'
+ORGCHART_CACHE_TIMEOUT = 60 * 60 * 24
+
+# The fields of a member that are included in the snapshot
+ORGCHART_MEMBER_FIELDS = {'first_name', 'last_name'}
+
+
+def get_member(member):
+    """Return the name and the link to the profile of a member."""
+    return {
+        'name': member.get_full_name(),
+        'url': member.get_absolute_url(),
+    }
+
+
+def get_orgchart():
+    """
+    Return a dict with a list of the board positions and a list of the
+    committees, in their order, in three queries.
+
+    Each board position has a ``name`` and a ``holder``, and each committee
+    has a ``pk``, a ``name``, a ``leader``, a ``leader_title`` and a list of
+    ``memberships`` with a ``title`` and a ``member``. The members have a
+    ``name`` and a ``url``.
+    """
+    positions = BoardPosition.objects.select_related('holder')
+    committees = Committee.objects.select_related('leader').prefetch_related(Prefetch(
+        'committeemembership_set',
+        queryset=CommitteeMembership.objects.select_related('member').order_by('pk'),
+    ))
+
+    return {
+        'board_positions': [{
+            'name': position.name,
+            'holder': get_member(position.holder),
+        } for position in positions],
+        'committees': [{
+            'pk': committee.pk,
+            'name': committee.name,
+            'leader': get_member(committee.leader) if committee.leader else None,
+            'leader_title': committee.leader_title,
+            'memberships': [{
+                'title': membership.title,
+                'member': get_member(membership.member),
+            } for membership in committee.committeemembership_set.all()],
+        } for committee in committees],
+    }
+
+
+def get_cached_orgchart():
+    """Return ``get_orgchart()``, cached until the board or a committee is changed."""
+    key = versioned_key(ORGCHART_CACHE)
+    orgchart = cache.get(key)
+    if orgchart is None:
+        orgchart = get_orgchart()
+        if can_cache():
+            cache.set(key, orgchart, ORGCHART_CACHE_TIMEOUT)
+    return orgchart
+
+
+def invalidate_orgchart_cache():
+    """
+    Invalidate the cached snapshot, for the current transaction and when
+    it is committed.
+    """
+    bump_version_on_commit(ORGCHART_CACHE)
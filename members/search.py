@@ -0,0 +1,164 @@
+"""
+Full-text search for :model:`members.Member`.
+
+The search index is stored in a separate table, created by the migrations
+for the database in use. On SQLite it is an FTS5 table, and on PostgreSQL
+it has a ``tsvector`` with a GIN index, and a trigram index on the name
+for misspelled names. The trigram index needs the ``pg_trgm`` extension,
+which only a superuser can create on PostgreSQL 9.6. The migration creates
+it if it can, and otherwise the search matches words only. On other
+databases the search falls back to ``icontains`` lookups.
+
+The index is tokenized without removing diacritics, so a search for
+``Ås`` does not match ``As``, and letters like æ, ø and å are folded to
+lower case like any other letter, which ``icontains`` doesn't do on SQLite.
+
+The index is kept up to date by the signals in ``members.signals``.
+"""
+import re
+from functools import lru_cache, reduce
+from operator import and_, or_
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Member
+
+
+SEARCH_TABLE = 'members_member_search'
+
+# The fields of a member that are included in the index
+SEARCH_FIELDS = {'first_name', 'last_name', 'email', 'instrument', 'city',
+                 'occupation', 'about_me'}
+
+WORD_RE = re.compile(r'\w+')
+
+
+def is_indexed():
+    """Return whether the database has a search index."""
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+@lru_cache()
+def has_trigram():
+    """Return whether the pg_trgm extension is installed, for similar names."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def get_words(query):
+    """Return the words in a search query, in lower case."""
+    return WORD_RE.findall(query.lower())
+
+
+def get_document(member):
+    """Return the text of a member to index, as a tuple of columns."""
+    return (
+        member.get_full_name(),
+        member.email,
+        member.instrument.name,
+        ' '.join([member.city, member.occupation, member.about_me]),
+    )
+
+
+def index_members(members):
+    """Add the given members to the index, or update them if they are already there."""
+    if not is_indexed():
+        return
+
+    rows = [(member.pk, *get_document(member)) for member in members]
+    if not rows:
+        return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany(
+                'INSERT OR REPLACE INTO %s (rowid, name, email, instrument, other) '
+                'VALUES (%%s, %%s, %%s, %%s, %%s)' % SEARCH_TABLE, rows)
+        else:
+            cursor.executemany(
+                "INSERT INTO %s (member_id, name, document) "
+                "VALUES (%%s, %%s, "
+                "  setweight(to_tsvector('simple', %%s), 'A') || "
+                "  setweight(to_tsvector('simple', %%s || ' ' || %%s), 'B') || "
+                "  setweight(to_tsvector('simple', %%s), 'C')) "
+                "ON CONFLICT (member_id) DO UPDATE "
+                "SET name = EXCLUDED.name, document = EXCLUDED.document" % SEARCH_TABLE,
+                [(row[0], row[1], row[1], row[2], row[3], row[4]) for row in rows])
+
+
+def unindex_members(pks):
+    """Remove the members with the given primary keys from the index."""
+    if not is_indexed():
+        return
+
+    column = 'rowid' if connection.vendor == 'sqlite' else 'member_id'
+    with connection.cursor() as cursor:
+        cursor.executemany('DELETE FROM %s WHERE %s = %%s' % (SEARCH_TABLE, column),
+                           [(pk,) for pk in pks])
+
+
+def rebuild_index():
+    """Remove everything from the index, and index every member."""
+    if not is_indexed():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM %s' % SEARCH_TABLE)
+    index_members(Member.objects.select_related('instrument').order_by().iterator())
+
+
+def search_ids(query, limit=10):
+    """
+    Return the primary keys of the members matching the query, best match first.
+
+    Every word in the query must match the start of a word in the member,
+    except on PostgreSQL with pg_trgm, where a name similar to the query
+    also matches.
+    """
+    words = get_words(query)
+    if not words:
+        return []
+
+    limit_sql = 'LIMIT %d' % limit if limit else ''
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                'SELECT rowid FROM {table} WHERE {table} MATCH %s ORDER BY rank {limit}'.format(
+                    table=SEARCH_TABLE, limit=limit_sql),
+                [' '.join('"%s"*' % word for word in words)])
+        elif connection.vendor == 'postgresql' and has_trigram():
+            cursor.execute(
+                "SELECT member_id FROM {table}, to_tsquery('simple', %s) query "
+                "WHERE document @@ query OR name %% %s "
+                "ORDER BY ts_rank(document, query) + similarity(name, %s) DESC {limit}".format(
+                    table=SEARCH_TABLE, limit=limit_sql),
+                [' & '.join('%s:*' % word for word in words), query, query])
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT member_id FROM {table}, to_tsquery('simple', %s) query "
+                "WHERE document @@ query ORDER BY ts_rank(document, query) DESC {limit}".format(
+                    table=SEARCH_TABLE, limit=limit_sql),
+                [' & '.join('%s:*' % word for word in words)])
+        else:
+            return list(fallback_search(words).values_list('pk', flat=True)[:limit])
+
+        return [row[0] for row in cursor.fetchall()]
+
+
+def fallback_search(words):
+    """Search for the words with ``icontains`` lookups, for databases without an index."""
+    fields = ['first_name', 'last_name', 'email', 'instrument__name', 'city',
+              'occupation', 'about_me']
+    return Member.objects.filter(reduce(and_, [
+        reduce(or_, [Q(**{'%s__icontains' % field: word}) for field in fields])
+        for word in words
+    ]))
+
+
+def search(query, limit=10):
+    """Return a list of the members matching the query, best match first."""
+    ids = search_ids(query, limit)
+    members = Member.objects.in_bulk(ids)
+    return [members[pk] for pk in ids if pk in members]
@@ -1,24 +1,141 @@
-from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.contrib.auth.models import Group
+from django.core.exceptions import ValidationError
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
 from django.dispatch import receiver
 
-from .models import InheritanceGroup, Committee
+from .backends import invalidate_permission_cache
+from .models import (Member, InheritanceGroup, InheritanceGroupClosure, Committee,
+                     MembershipPeriod, LeavePeriod, Instrument, BoardPosition)
+from . import search
+from .memberlist import MEMBER_LIST_FIELDS, invalidate_member_list_cache
+from .orgchart import ORGCHART_MEMBER_FIELDS, invalidate_orgchart_cache
+from .statistics import invalidate_headcount_cache
+
+
+@receiver(m2m_changed, sender=InheritanceGroup.parents.through)
+def update_hierarchy(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        parents, children = {instance.pk}, pk_set
+    else:
+        parents, children = pk_set, {instance.pk}
+
+    if action == 'pre_add':
+        # A group can't inherit from itself, or any group inheriting from it
+        if parents & children or InheritanceGroupClosure.objects.filter(
+                ancestor__in=children, descendant__in=parents).exists():
+            raise ValidationError('En gruppe kan ikke arve fra seg selv eller sine undergrupper.')
+    elif action in ['post_add', 'post_remove', 'post_clear']:
+        # When the sub groups of a group are cleared pk_set is None, but the
+        # closure still contains the old sub groups at this point
+        InheritanceGroupClosure.rebuild(children if children else
+                                        instance.get_sub_groups().values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=InheritanceGroup)
+def store_sub_groups(sender, instance, **kwargs):
+    instance._deleted_sub_groups = list(instance.get_sub_groups().values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=InheritanceGroup)
+def update_sub_groups(sender, instance, **kwargs):
+    sub_groups = getattr(instance, '_deleted_sub_groups', [])
+    InheritanceGroupClosure.rebuild(sub_groups)
+    InheritanceGroup.propagate_permissions(sub_groups)
+    invalidate_permission_cache()
 
 
 @receiver(m2m_changed, sender=InheritanceGroup.parents.through)
 @receiver(m2m_changed, sender=InheritanceGroup.own_permissions.through)
-def update_permissions(sender, instance, action, reverse, **kwargs):
-    if not reverse and action in ['post_add', 'post_remove', 'post_clear']:
-        instance.update_permissions()
+def update_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ['post_add', 'post_remove', 'post_clear']:
+        if not reverse:
+            instance.update_permissions()
+        elif pk_set is not None:
+            InheritanceGroup.propagate_permissions(pk_set)
+        else:
+            # We don't know which groups were affected by the clear
+            InheritanceGroup.propagate_permissions(
+                InheritanceGroup.objects.values_list('pk', flat=True))
+
+        invalidate_permission_cache()
 
 
 @receiver(post_save, sender=Committee.members.through)
 @receiver(post_delete, sender=Committee.members.through)
 @receiver(post_save, sender=Committee)
 def update_committee_members(sender, instance, **kwargs):
+    """Sync the members of the group of the committee when the transaction is committed."""
     committee = instance if isinstance(instance, Committee) else instance.committee
+    committee.schedule_sync()
+
+
+@receiver(m2m_changed, sender=Member.groups.through)
+@receiver(m2m_changed, sender=Member.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def update_permission_cache(sender, action, **kwargs):
+    if action in ['post_add', 'post_remove', 'post_clear']:
+        invalidate_permission_cache()
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+@receiver(post_delete, sender=Group)
+def update_permission_cache_on_change(sender, created=True, **kwargs):
+    # A new member could reuse the primary key of a deleted member
+    if created:
+        invalidate_permission_cache()
+
+
+@receiver(post_save, sender=MembershipPeriod)
+@receiver(post_delete, sender=MembershipPeriod)
+@receiver(post_save, sender=LeavePeriod)
+@receiver(post_delete, sender=LeavePeriod)
+def update_headcount_cache(sender, **kwargs):
+    invalidate_headcount_cache()
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+@receiver(post_save, sender=Instrument)
+@receiver(post_delete, sender=Instrument)
+@receiver(post_save, sender=BoardPosition)
+@receiver(post_delete, sender=BoardPosition)
+@receiver(post_save, sender=MembershipPeriod)
+@receiver(post_delete, sender=MembershipPeriod)
+@receiver(post_save, sender=LeavePeriod)
+@receiver(post_delete, sender=LeavePeriod)
+def update_member_list_cache(sender, update_fields=None, **kwargs):
+    # Saving only fields that are not shown, like the last login, keeps the cache
+    if sender is Member and update_fields and not MEMBER_LIST_FIELDS & set(update_fields):
+        return
+    invalidate_member_list_cache()
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+@receiver(post_save, sender=BoardPosition)
+@receiver(post_delete, sender=BoardPosition)
+@receiver(post_delete, sender=Committee)
+def update_orgchart_cache(sender, update_fields=None, **kwargs):
+    # Changes to committees and their members are invalidated when the committee is synced
+    if sender is Member and update_fields and not ORGCHART_MEMBER_FIELDS & set(update_fields):
+        return
+    invalidate_orgchart_cache()
+
+
+@receiver(post_save, sender=Member)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not search.SEARCH_FIELDS & set(update_fields):
+        return
+    search.index_members([instance])
+
+
+@receiver(post_delete, sender=Member)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.unindex_members([instance.pk])
 
-    members = list(committee.members.all())
-    if committee.leader:
-        members.append(committee.leader)
 
-    committee.user_set.set(members)
+@receiver(post_save, sender=Instrument)
+def update_instrument_search_index(sender, instance, created, **kwargs):
+    if not created:
+        search.index_members(instance.players.select_related('instrument'))
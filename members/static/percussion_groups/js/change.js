@@ -1,28 +1,49 @@
 $(document).ready(function() {
     $('.save-button').click(function() {
+        var table = $('.member-list');
+        var current = table.data('group');
         var leader = $('input[name=group-leader]:checked').data('id');
-        var members = [];
-        $('.col-member-select input[type=checkbox]:checked').each(function() {
-            members.push($(this).data('id'));
+        var groups = {};
+
+        function getGroup(id) {
+            if (typeof groups[id] == 'undefined') {
+                groups[id] = {id: id, leader: null, members: []};
+            }
+            return groups[id];
+        }
+
+        // Send the groups of all members, so every group is saved in one request
+        getGroup(current).leader = typeof leader == 'undefined' ? null : leader;
+        table.find('tr[data-member]').each(function() {
+            var row = $(this);
+            var member = row.data('member');
+            var group = row.data('group');
+
+            if (row.find('.col-member-select input').is(':checked') || member === leader) {
+                group = current;
+            } else if (group === current || group === '') {
+                return;
+            } else if (row.data('leader')) {
+                getGroup(group).leader = member;
+            }
+
+            getGroup(group).members.push(member);
         });
 
-        $.post({
-            url: '',
+        $.ajax({
+            url: table.data('url'),
+            method: 'POST',
             headers: {'X-CSRFToken': getCookie('csrftoken')},
-            data: {
-                leader: leader,
-                members: members,
-            },
+            contentType: 'application/json',
+            data: JSON.stringify({groups: Object.values(groups)}),
             success: function(data) {
-                if (typeof data['success'] == 'undefined' || !data['success']) {
-                    error = true;
-                    if (typeof data['error'] == 'undefined') {
-                        alert('Det har oppstått en feil. Ta kontakt med webkom.');
-                    } else {
-                        alert(data['error']);
-                    }
+                document.location.href = data['next'];
+            },
+            error: function(xhr) {
+                if (xhr.responseJSON && typeof xhr.responseJSON['error'] != 'undefined') {
+                    alert(xhr.responseJSON['error']);
                 } else {
-                    document.location.href = data['next'];
+                    alert('Det har oppstått en feil. Ta kontakt med webkom.');
                 }
             }
         });
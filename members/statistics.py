@@ -0,0 +1,296 @@
+"""
+Build the tables shown by :view:`members.views.MemberStatistics`.
+
+Every table is a selection of either membership or leave periods, so
+instead of querying once per table the periods that can appear in any
+of them are fetched once per model, and sorted into the tables in Python.
+"""
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.core.cache import cache
+
+from utils.cache import bump_version_on_commit, can_cache, versioned_key
+
+from .models import MembershipPeriod, LeavePeriod
+
+
+HEADCOUNT_CACHE = 'members.headcount'
+HEADCOUNT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+MEMBERSHIP_COLS = ['Navn', 'Startet', 'Sluttet']
+LEAVE_COLS = ['Navn', 'Gikk i permisjon', 'Gikk ut av permisjon']
+
+
+def _ends_after(period, day):
+    return period.end is None or period.end > day
+
+
+def _ends_within(period, start, end):
+    return period.end is not None and start <= period.end <= end
+
+
+# ``includes`` takes a period and the start and end of the range,
+# and returns whether the period belongs in the table.
+StatisticsTable = namedtuple('StatisticsTable', ['model', 'cols', 'includes'])
+
+
+TABLES = OrderedDict([
+    ('members_start', StatisticsTable(
+        MembershipPeriod, MEMBERSHIP_COLS,
+        lambda p, start, end: p.start < start and _ends_after(p, start))),
+    ('members_end', StatisticsTable(
+        MembershipPeriod, MEMBERSHIP_COLS,
+        lambda p, start, end: p.start < end and _ends_after(p, end))),
+    ('new', StatisticsTable(
+        MembershipPeriod, ['Navn', 'Startet'],
+        lambda p, start, end: start <= p.start <= end and p.end is None)),
+    ('quit', StatisticsTable(
+        MembershipPeriod, MEMBERSHIP_COLS,
+        lambda p, start, end: _ends_within(p, start, end))),
+    ('joined_quit', StatisticsTable(
+        MembershipPeriod, MEMBERSHIP_COLS,
+        lambda p, start, end: start <= p.start <= end and _ends_within(p, start, end))),
+    ('leave_start', StatisticsTable(
+        LeavePeriod, LEAVE_COLS,
+        lambda p, start, end: p.start < start and _ends_within(p, start, end))),
+    ('leave_end', StatisticsTable(
+        LeavePeriod, LEAVE_COLS,
+        lambda p, start, end: start <= p.start <= end and _ends_after(p, end))),
+    ('leave_whole', StatisticsTable(
+        LeavePeriod, LEAVE_COLS,
+        lambda p, start, end: p.start < start and p.end is not None and p.end > end)),
+    ('leave_part', StatisticsTable(
+        LeavePeriod, LEAVE_COLS,
+        lambda p, start, end: p.start >= start and p.end is not None and p.end < end)),
+])
+
+
+def get_periods(model, start, end):
+    """
+    Return the periods of the given model that can be included in a table
+    for the range from ``start`` to ``end``, with their members.
+    """
+    # Every table includes both ends of the range, so widen it by a day
+    # on each side to get the periods that touch it.
+    day = timedelta(days=1)
+    return model.objects.overlaps(start - day, end + day).select_related('member')
+
+
+def get_row(period, spec):
+    """Return the row for a period in a table."""
+    return [period.member.get_full_name(), period.start, period.end][:len(spec.cols)]
+
+
+def get_tables(start, end, names):
+    """
+    Return the tables with the given names for the range from ``start``
+    to ``end``, in the order of ``TABLES``.
+
+    Each table is a dict with the name, the column headers, the rows and
+    the number of rows. At most one query is made per period model.
+    """
+    tables = OrderedDict(
+        (name, {'name': name, 'cols': spec.cols, 'rows': [], 'num': 0})
+        for name, spec in TABLES.items() if name in names
+    )
+
+    for model in (MembershipPeriod, LeavePeriod):
+        specs = [(name, TABLES[name]) for name in tables if TABLES[name].model is model]
+        if not specs:
+            continue
+
+        for period in get_periods(model, start, end):
+            for name, spec in specs:
+                if spec.includes(period, start, end):
+                    table = tables[name]
+                    table['rows'].append(get_row(period, spec))
+                    table['num'] += 1
+
+    return list(tables.values())
+
+
+def iter_rows(name, start, end):
+    """
+    Yield the rows of a table one by one, as they are read from the database.
+
+    Unlike ``get_tables`` this makes one query per table, but never holds
+    more than one period in memory.
+    """
+    spec = TABLES[name]
+    for period in get_periods(spec.model, start, end).iterator():
+        if spec.includes(period, start, end):
+            yield get_row(period, spec)
+
+
+def iter_csv(start, end, tables):
+    """
+    Yield the rows of the CSV export of the given tables, which is a list
+    of ``(name, title)`` tuples.
+    """
+    yield ['Medlemsstatistikk for perioden %s til %s' % (start, end)]
+    yield []
+    yield []
+
+    for name, title in tables:
+        yield [title]
+
+        num = 0
+        for row in iter_rows(name, start, end):
+            if not num:
+                yield TABLES[name].cols
+            yield row
+            num += 1
+
+        if num:
+            yield ['Totalt:', num]
+        else:
+            yield ['Ingen']
+        yield []
+        yield []
+
+
+def get_buckets(start, end, interval):
+    """
+    Split the range from ``start`` to ``end``, inclusive, into buckets
+    of a day, a week or a month, and return the first day of each bucket.
+
+    Weeks are counted from ``start``, while months after the first
+    start on the first day of the month.
+    """
+    buckets = []
+    day = start
+    while day <= end:
+        buckets.append(day)
+        if interval == 'day':
+            day += timedelta(days=1)
+        elif interval == 'week':
+            day += timedelta(days=7)
+        else:
+            day = (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return buckets
+
+
+def count_buckets(start, end, interval):
+    """Return the number of buckets ``get_buckets`` splits the range into."""
+    if interval == 'day':
+        return (end - start).days + 1
+    elif interval == 'week':
+        return (end - start).days // 7 + 1
+    return (end.year - start.year) * 12 + end.month - start.month + 1
+
+
+class PeriodSweep:
+    """
+    Count members by sweeping over the sorted start and end dates of
+    their periods.
+
+    All the dates are read in one query, after which every count is
+    a binary search, however many dates are asked about. The periods of
+    each member that overlap or follow right after each other are merged
+    first, so every member is counted once.
+    """
+    def __init__(self, model, end):
+        self.starts = []
+        self.ends = []
+
+        periods = model.objects.filter(start__lte=end)\
+                               .order_by('member_id', 'start')\
+                               .values_list('member_id', 'start', 'end')
+        for _, member_periods in groupby(periods, key=itemgetter(0)):
+            merged_start = merged_end = None
+            for member, start, period_end in member_periods:
+                if merged_start is not None and (merged_end is None or start <= merged_end):
+                    if merged_end is not None and (period_end is None or period_end > merged_end):
+                        merged_end = period_end
+                    continue
+
+                self.add(merged_start, merged_end)
+                merged_start, merged_end = start, period_end
+            self.add(merged_start, merged_end)
+
+        self.starts.sort()
+        self.ends.sort()
+
+    def add(self, start, end):
+        if start is None:
+            return
+        self.starts.append(start)
+        if end is not None:
+            self.ends.append(end)
+
+    def containing(self, day):
+        """Return the number of periods that contain the given day."""
+        # A period that has ended by the day must also have started by then
+        return bisect_right(self.starts, day) - bisect_right(self.ends, day)
+
+    def starting(self, start, end):
+        """Return the number of periods starting from ``start`` up to ``end``."""
+        return bisect_left(self.starts, end) - bisect_left(self.starts, start)
+
+    def ending(self, start, end):
+        """Return the number of periods ending from ``start`` up to ``end``."""
+        return bisect_left(self.ends, end) - bisect_left(self.ends, start)
+
+
+def get_headcount(start, end, interval):
+    """
+    Return the number of members over time, from ``start`` to ``end``.
+
+    For each bucket returned by ``get_buckets`` the result contains the
+    number of active members and members on leave on the last day of the
+    bucket, and the number of members who joined and quit during it. A
+    member with overlapping periods is only counted once. The
+    counts are stored in lists parallel to ``dates``.
+    """
+    memberships = PeriodSweep(MembershipPeriod, end)
+    leaves = PeriodSweep(LeavePeriod, end)
+
+    buckets = get_buckets(start, end, interval)
+    result = {
+        'start': start,
+        'end': end,
+        'interval': interval,
+        'dates': buckets,
+        'active': [],
+        'on_leave': [],
+        'joined': [],
+        'quit': [],
+    }
+
+    for bucket_start, bucket_end in zip(buckets, buckets[1:] + [end + timedelta(days=1)]):
+        last_day = bucket_end - timedelta(days=1)
+        result['active'].append(memberships.containing(last_day))
+        result['on_leave'].append(leaves.containing(last_day))
+        result['joined'].append(memberships.starting(bucket_start, bucket_end))
+        result['quit'].append(memberships.ending(bucket_start, bucket_end))
+
+    return result
+
+
+def get_cached_headcount(start, end, interval):
+    """
+    Return ``get_headcount()``, cached until a period is changed.
+
+    The cache is invalidated by ``invalidate_headcount_cache()``, which
+    is called by the signals in ``members.signals``.
+    """
+    key = versioned_key(HEADCOUNT_CACHE, start, end, interval)
+    headcount = cache.get(key)
+    if headcount is None:
+        headcount = get_headcount(start, end, interval)
+        if can_cache():
+            cache.set(key, headcount, HEADCOUNT_CACHE_TIMEOUT)
+    return headcount
+
+
+def invalidate_headcount_cache():
+    """
+    Invalidate the cached headcounts, for the current transaction and when
+    it is committed.
+    """
+    bump_version_on_commit(HEADCOUNT_CACHE)
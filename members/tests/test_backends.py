@@ -0,0 +1,131 @@
+from django.core.cache import cache
+from django.core.checks import Error
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth.models import Permission
+
+from utils.cache import versioned_key
+from ..backends import PERMISSION_CACHE
+from ..checks import check_permission_cache
+from ..models import Member, InheritanceGroup, Committee
+from base.tests import permission_to_perm
+from .utils import generate_member
+
+
+class CachedPermissionBackendTestCase(TestCase):
+    def setUp(self):
+        self.member = generate_member()
+        self.group = InheritanceGroup.objects.create(name='Group')
+        self.member.groups.add(self.group)
+        self.permission = Permission.objects.get(codename='statistics')
+        self.perm = permission_to_perm(self.permission)
+
+    def get_member(self):
+        return Member.objects.get(pk=self.member.pk)
+
+    def test_group_permissions_changed(self):
+        self.assertFalse(self.get_member().has_perm(self.perm))
+
+        self.group.own_permissions.add(self.permission)
+        self.assertTrue(self.get_member().has_perm(self.perm))
+
+        self.group.own_permissions.remove(self.permission)
+        self.assertFalse(self.get_member().has_perm(self.perm))
+
+    def test_parent_permissions_changed(self):
+        parent = InheritanceGroup.objects.create(name='Parent')
+        self.group.parents.add(parent)
+        self.assertFalse(self.get_member().has_perm(self.perm))
+
+        parent.own_permissions.add(self.permission)
+        self.assertTrue(self.get_member().has_perm(self.perm))
+
+    def test_user_permissions_changed(self):
+        self.assertFalse(self.get_member().has_perm(self.perm))
+        self.member.user_permissions.add(self.permission)
+        self.assertTrue(self.get_member().has_perm(self.perm))
+
+    def test_superuser(self):
+        self.assertFalse(self.get_member().has_perm(self.perm))
+        self.member.is_superuser = True
+        self.member.save()
+        self.assertTrue(self.get_member().has_perm(self.perm))
+
+
+class CommitteePermissionCacheTestCase(TransactionTestCase):
+    # The members of committees are synced when the transaction is committed
+
+    def test_committee_membership_changed(self):
+        member = generate_member()
+        permission = Permission.objects.get(codename='statistics')
+        perm = permission_to_perm(permission)
+        committee = Committee.objects.create(name='Com1', email='com1@example.com')
+        committee.own_permissions.add(permission)
+        self.assertFalse(Member.objects.get(pk=member.pk).has_perm(perm))
+
+        committee.add_member(member)
+        self.assertTrue(Member.objects.get(pk=member.pk).has_perm(perm))
+
+        committee.remove_member(member)
+        self.assertFalse(Member.objects.get(pk=member.pk).has_perm(perm))
+
+
+class PermissionCacheTestCase(TransactionTestCase):
+    # Permissions are only cached outside of transactions
+
+    def setUp(self):
+        self.member = generate_member()
+        self.permission = Permission.objects.get(codename='statistics')
+        self.perm = permission_to_perm(self.permission)
+        self.member.user_permissions.add(self.permission)
+
+    def get_member(self):
+        return Member.objects.get(pk=self.member.pk)
+
+    def test_cached_across_requests(self):
+        self.assertTrue(self.get_member().has_perm(self.perm))
+
+        member = self.get_member()
+        with self.assertNumQueries(0):
+            self.assertTrue(member.has_perm(self.perm))
+            self.assertFalse(member.has_perm('members.change_member'))
+
+    def test_not_cached_in_transaction(self):
+        with transaction.atomic():
+            self.assertTrue(self.get_member().has_perm(self.perm))
+            self.member.user_permissions.remove(self.permission)
+            self.assertFalse(self.get_member().has_perm(self.perm))
+            transaction.set_rollback(True)
+
+        self.assertTrue(self.get_member().has_perm(self.perm))
+
+    def test_invalidated_on_commit(self):
+        self.assertTrue(self.get_member().has_perm(self.perm))
+
+        with transaction.atomic():
+            self.member.user_permissions.remove(self.permission)
+            # A concurrent request reads the permissions before the commit
+            key = versioned_key(PERMISSION_CACHE, self.member.pk, False)
+            cache.set(key, {self.perm})
+
+        self.assertFalse(self.get_member().has_perm(self.perm))
+
+
+class PermissionCacheCheckTestCase(TestCase):
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_cache(self):
+        errors = check_permission_cache(None)
+        self.assertEqual([error.id for error in errors], ['members.E001'])
+        self.assertIsInstance(errors[0], Error)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}})
+    def test_shared_cache(self):
+        self.assertEqual(check_permission_cache(None), [])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.ModelBackend'])
+    def test_other_backend(self):
+        self.assertEqual(check_permission_cache(None), [])
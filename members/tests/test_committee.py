@@ -1,4 +1,9 @@
-from django.test import TestCase
+from unittest import mock
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import Permission
 from django.urls import reverse
 
@@ -37,7 +42,9 @@ class ChangeCommitteeTestCase(TestCase):
         self.assertIn('formset', response.context)
 
 
-class CommitteeChangeFormTestCase(TestCase):
+class CommitteeChangeFormTestCase(TransactionTestCase):
+    # The members of committees are synced when the transaction is committed
+
     def form_data(self, committee):
         return {
             'name': committee.name,
@@ -71,7 +78,9 @@ class CommitteeChangeFormTestCase(TestCase):
         self.assertIn(member2, committee_members)
 
 
-class CommitteeMembershipFormsetTestCase(TestCase):
+class CommitteeMembershipFormsetTestCase(TransactionTestCase):
+    # The members of committees are synced when the transaction is committed
+
     prefix = CommitteeMembershipFormset().prefix
 
     def formset_post(self, committee=None):
@@ -150,3 +159,167 @@ class CommitteeMembershipFormsetTestCase(TestCase):
         self.assertNotIn(member2, committee_members)
         self.assertIn(member3, committee.members.all())
         self.assertIn(member3, committee_members)
+
+
+class CommitteeSyncTestCase(TransactionTestCase):
+    def group_members(self, committee):
+        return set(Member.objects.filter(groups__pk=committee.pk))
+
+    def test_sync_once_per_transaction(self):
+        leader = generate_member()
+        members = [generate_member() for i in range(10)]
+        committee = Committee.objects.create(name='Com1', leader=leader, email='com1@example.com')
+
+        with transaction.atomic():
+            for member in members:
+                committee.add_member(member)
+            # Nothing is synced before the transaction is committed
+            self.assertEqual(self.group_members(committee), {leader})
+        self.assertEqual(self.group_members(committee), {leader, *members})
+
+    def test_sync_writes_difference(self):
+        members = [generate_member() for i in range(3)]
+        committee = Committee.objects.create(name='Com1', leader=members[0],
+                                             email='com1@example.com')
+        committee.add_member(members[1])
+
+        with CaptureQueriesContext(connection) as queries:
+            committee.add_member(members[2])
+        writes = [query['sql'] for query in queries
+                  if 'members_member_groups' in query['sql'] and
+                  not query['sql'].startswith('SELECT')]
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(writes[0].startswith('INSERT'))
+
+        self.assertFalse(Committee.sync_members([committee.pk]))
+        self.assertEqual(self.group_members(committee), set(members))
+
+    def test_rolled_back(self):
+        member = generate_member()
+        committee = Committee.objects.create(name='Com1', email='com1@example.com')
+
+        try:
+            with transaction.atomic():
+                committee.add_member(member)
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(self.group_members(committee), set())
+
+        committee.save()
+        self.assertEqual(self.group_members(committee), set())
+
+    def test_view(self):
+        user = generate_member()
+        user.user_permissions.add(Permission.objects.get(codename="change_committee"))
+        members = [generate_member() for i in range(3)]
+        committee = Committee.objects.create(name='Com1', leader=user, email='com1@example.com')
+
+        formset = CommitteeMembershipFormset(instance=committee, prefix='formset')
+        prefix = formset.prefix
+        data = {
+            **management_form_to_post(formset.management_form),
+            'committee_form-name': committee.name,
+            'committee_form-email': committee.email,
+            'committee_form-order': '0',
+            'committee_form-leader': str(user.pk),
+            'committee_form-leader_title': '',
+            'committee_form-description': '',
+        }
+        for i, member in enumerate(members):
+            data[f'{prefix}-{i}-member'] = str(member.pk)
+            data[f'{prefix}-{i}-title'] = 'Medlem'
+
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("change_committee", args=[committee.pk]), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.group_members(committee), {user, *members})
+
+        inserts = [query['sql'] for query in queries
+                   if query['sql'].startswith('INSERT INTO "members_member_groups"')]
+        self.assertEqual(len(inserts), 1)
+
+
+class CommitteeBulkMembersTestCase(TransactionTestCase):
+    def setUp(self):
+        self.committee = Committee.objects.create(name='Com1', email='com1@example.com')
+
+    def group_members(self, committee):
+        return set(Member.objects.filter(groups__pk=committee.pk))
+
+    def titles(self, committee):
+        return {membership.member: membership.title
+                for membership in committee.member_titles().select_related('member')}
+
+    def test_add_members(self):
+        members = [generate_member() for i in range(3)]
+        self.committee.add_members(members[:2], title='Sekretær')
+        self.committee.add_members({members[1]: 'Kasserer', members[2]: 'Kasserer'})
+
+        self.assertEqual(self.titles(self.committee), {
+            members[0]: 'Sekretær',
+            members[1]: 'Sekretær',
+            members[2]: 'Kasserer',
+        })
+        self.assertEqual(self.group_members(self.committee), set(members))
+
+    def test_add_members_default_title(self):
+        member = generate_member()
+        self.committee.add_members([member])
+        self.assertEqual(self.titles(self.committee), {member: 'Medlem'})
+
+    def test_add_members_query_count(self):
+        def count_queries(n):
+            members = [generate_member() for i in range(n)]
+            committee = Committee.objects.create(name=f'Com{n}', email=f'com{n}@example.com')
+            with CaptureQueriesContext(connection) as queries:
+                committee.add_members(members)
+            self.assertEqual(self.group_members(committee), set(members))
+            return len(queries)
+
+        self.assertEqual(count_queries(2), count_queries(20))
+
+    def test_add_members_concurrently(self):
+        members = [generate_member() for i in range(2)]
+        self.committee.add_member(members[0])
+
+        # Another request adds members[0] between the read and the INSERT
+        patcher = mock.patch.object(QuerySet, 'values_list')
+
+        def stale(*args, **kwargs):
+            patcher.stop()
+            return []
+        patcher.start().side_effect = stale
+
+        memberships = self.committee.add_members(members)
+        self.assertEqual([membership.member for membership in memberships], [members[1]])
+        self.assertEqual(self.group_members(self.committee), set(members))
+
+    def test_add_members_unique(self):
+        member = generate_member()
+        self.committee.add_member(member)
+        with self.assertRaises(IntegrityError):
+            Committee.members.through.objects.create(committee=self.committee, member=member)
+
+    def test_remove_members(self):
+        members = [generate_member() for i in range(4)]
+        self.committee.add_members(members)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.committee.remove_members(members[:3]), 3)
+        deletes = [query['sql'] for query in queries
+                   if query['sql'].startswith('DELETE FROM "members_committeemembership"')]
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual(self.group_members(self.committee), {members[3]})
+
+    def test_remove_member_scoped(self):
+        member = generate_member()
+        other = Committee.objects.create(name='Com2', email='com2@example.com')
+        self.committee.add_member(member)
+        other.add_member(member)
+
+        self.committee.remove_member(member)
+        self.assertEqual(self.group_members(self.committee), set())
+        self.assertEqual(self.group_members(other), {member})
+        self.assertIn(member, other.members.all())
@@ -1,18 +1,23 @@
 from datetime import date
 import datetime
 
-from django.test import TestCase, Client
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, Client
 from django.forms import modelform_factory
 from django.core.management import call_command
 from django.utils.six import StringIO
 from django.utils import timezone
-from django.contrib.auth.models import Permission
+from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
 from django.urls import reverse
 
+from utils.cache import get_version
 from utils.forms import formset_to_post, form_to_post
 
-from ..models import Member, PercussionGroup, BoardPosition, InheritanceGroup, MembershipPeriod
+from ..models import (Member, PercussionGroup, BoardPosition, InheritanceGroup,
+                      MembershipPeriod, LeavePeriod, Instrument)
+from ..memberlist import MEMBER_LIST_CACHE
 from ..forms import MemberAddForm, MembershipPeriodFormset, LeavePeriodFormset
 from base.tests import permission_to_perm
 from .utils import generate_member, generate_member_attrs
@@ -43,6 +48,191 @@ class MemberTestCase(TestCase):
         period.save()
         self.assertTrue(member.is_active)
 
+    def test_changed_fields(self):
+        member = Member.objects.get(pk=generate_member().pk)
+        self.assertEqual(member.get_changed_fields(), set())
+
+        member.first_name = 'Changed'
+        member.phone = '12345678'
+        self.assertEqual(member.get_changed_fields(), {'first_name', 'phone'})
+        self.assertTrue(member.has_changed('phone'))
+        self.assertFalse(member.has_changed('is_active'))
+
+        member.save()
+        self.assertEqual(member.get_changed_fields(), set())
+
+    def test_save_changed_fields(self):
+        member = Member.objects.get(pk=generate_member().pk)
+        Member.objects.filter(pk=member.pk).update(first_name='Changed')
+
+        member.phone = '12345678'
+        with self.assertNumQueries(1):
+            member.save()
+
+        member.refresh_from_db()
+        self.assertEqual(member.first_name, 'Changed')
+        self.assertEqual(member.phone, '12345678')
+        self.assertEqual(member.get_changed_fields(), set())
+
+        with self.assertNumQueries(0):
+            member.save()
+
+    def test_period_save_queries(self):
+        member = generate_member()
+        period = member.membership_periods.first()
+        period.end = date.today()
+
+        # Save the period, check for open periods, look for
+        # percussion group leadership and update the member
+        with self.assertNumQueries(4):
+            period.save()
+
+        member.refresh_from_db()
+        self.assertFalse(member.is_active)
+
+
+class UpdateMemberStatusTestCase(TestCase):
+    def test_update_status(self):
+        today = date.today()
+        yesterday = today - datetime.timedelta(days=1)
+        tomorrow = today + datetime.timedelta(days=1)
+
+        active = generate_member()
+        quit = generate_member()
+        leave = generate_member()
+        back = generate_member()
+
+        # Change the periods without updating the members, like the
+        # days passing would do
+        MembershipPeriod.objects.filter(member=quit).update(end=yesterday)
+        LeavePeriod.objects.bulk_create([
+            LeavePeriod(member=leave, start=yesterday, end=tomorrow),
+            LeavePeriod(member=back, start=date(2017, 1, 1), end=today),
+        ])
+        Member.objects.filter(pk=back.pk).update(is_on_leave=True)
+
+        group = PercussionGroup.objects.create(leader=quit)
+        Member.objects.filter(pk=quit.pk).update(percussion_group=group)
+
+        with self.assertNumQueries(3):
+            self.assertEqual(Member.objects.update_status(), 4)
+
+        for member in [active, quit, leave, back]:
+            member.refresh_from_db()
+        group.refresh_from_db()
+
+        self.assertTrue(active.is_active)
+        self.assertFalse(active.is_on_leave)
+        self.assertFalse(quit.is_active)
+        self.assertIsNone(quit.percussion_group)
+        self.assertIsNone(group.leader)
+        self.assertTrue(leave.is_on_leave)
+        self.assertFalse(back.is_on_leave)
+
+    def test_update_status_on_date(self):
+        member = generate_member()
+        Member.objects.update_status(date(2016, 12, 31))
+        member.refresh_from_db()
+        self.assertFalse(member.is_active)
+
+    def test_invalidates_member_list(self):
+        generate_member()
+        version = get_version(MEMBER_LIST_CACHE)
+        Member.objects.update_status()
+        self.assertNotEqual(get_version(MEMBER_LIST_CACHE), version)
+
+    def test_scope(self):
+        member = generate_member()
+        other = generate_member()
+        group = PercussionGroup.objects.create(leader=other)
+        Member.objects.filter(pk=other.pk).update(is_active=False, percussion_group=group)
+
+        Member.objects.filter(pk=member.pk).update_status()
+        other.refresh_from_db()
+        group.refresh_from_db()
+
+        # Members outside the queryset are left alone
+        self.assertEqual(other.percussion_group, group)
+        self.assertEqual(group.leader, other)
+
+    def test_superuser_can_log_in(self):
+        attrs = generate_member_attrs()
+        password = 'hunter2hunter2'
+        superuser = Member.objects.create_superuser(
+            attrs['email'], attrs['first_name'], attrs['last_name'], attrs['instrument'],
+            attrs['birthday'], attrs['phone'], attrs['address'], attrs['zip_code'],
+            attrs['city'], password)
+        superuser.membership_periods.all().delete()
+
+        call_command('updatememberstatus', stdout=StringIO())
+        superuser.refresh_from_db()
+
+        self.assertTrue(superuser.is_active)
+        self.assertTrue(self.client.login(username=superuser.email, password=password))
+
+    def test_command(self):
+        member = generate_member()
+        Member.objects.filter(pk=member.pk).update(is_active=False)
+
+        out = StringIO()
+        call_command('updatememberstatus', stdout=out)
+        member.refresh_from_db()
+
+        self.assertTrue(member.is_active)
+        self.assertIn('Updated the status of 1 members', out.getvalue())
+
+
+class PeriodQuerySetTestCase(TestCase):
+    def setUp(self):
+        # generate_member starts a period on 2017-01-01
+        self.old = generate_member()
+        self.old.membership_periods.update(end=date(2017, 6, 1))
+        self.current = generate_member()
+        self.short = generate_member()
+        self.short.membership_periods.update(start=date(2017, 3, 1), end=date(2017, 4, 1))
+
+    def periods(self, queryset):
+        return set(queryset.values_list('member', flat=True))
+
+    def test_contains(self):
+        periods = MembershipPeriod.objects
+        self.assertEqual(self.periods(periods.contains(date(2016, 12, 31))), set())
+        self.assertEqual(self.periods(periods.contains(date(2017, 1, 1))),
+                         {self.old.pk, self.current.pk})
+        self.assertEqual(self.periods(periods.contains(date(2017, 3, 15))),
+                         {self.old.pk, self.current.pk, self.short.pk})
+        # The end date is not part of the period
+        self.assertEqual(self.periods(periods.contains(date(2017, 6, 1))), {self.current.pk})
+
+    def test_overlaps(self):
+        periods = MembershipPeriod.objects
+        self.assertEqual(self.periods(periods.overlaps(date(2016, 1, 1), date(2017, 1, 1))), set())
+        self.assertEqual(self.periods(periods.overlaps(date(2017, 4, 1), date(2017, 7, 1))),
+                         {self.old.pk, self.current.pk})
+        self.assertEqual(self.periods(periods.overlaps(date(2017, 6, 1), date(2018, 1, 1))),
+                         {self.current.pk})
+
+    def test_within(self):
+        periods = MembershipPeriod.objects
+        self.assertEqual(self.periods(periods.within(date(2017, 1, 1), date(2017, 6, 1))),
+                         {self.old.pk, self.short.pk})
+        self.assertEqual(self.periods(periods.within(date(2017, 2, 1), date(2017, 12, 1))),
+                         {self.short.pk})
+
+    def test_related_manager(self):
+        self.assertTrue(self.current.membership_periods.contains(date(2018, 1, 1)).exists())
+        self.assertFalse(self.old.membership_periods.contains(date(2018, 1, 1)).exists())
+
+    def test_active_on(self):
+        LeavePeriod.objects.create(member=self.current, start=date(2017, 2, 1), end=date(2017, 5, 1))
+
+        with self.assertNumQueries(1):
+            active = set(Member.objects.active_on(date(2017, 3, 15)))
+        self.assertEqual(active, {self.old, self.current, self.short})
+        self.assertEqual(set(Member.objects.active_on(date(2017, 6, 1))), {self.current})
+        self.assertEqual(set(Member.objects.on_leave_on(date(2017, 3, 15))), {self.current})
+        self.assertEqual(set(Member.objects.on_leave_on(date(2017, 5, 1))), set())
+
 
 class MakeSuperuserTestCase(TestCase):
     def setUp(self):
@@ -344,6 +534,86 @@ class InheritanceGroupTestCase(TestCase):
 
         self.assertEqual(misc.get_available_parents().count(), 6)
 
+    def test_circular_inheritance(self):
+        org = InheritanceGroup.objects.get(name='Org')
+        dev = InheritanceGroup.objects.get(name='Dev')
+        leder = InheritanceGroup.objects.get(name='Leder')
+
+        self.assertTrue(leder.inherits_from(org))
+        self.assertFalse(org.inherits_from(leder))
+
+        with self.assertRaises(ValidationError), transaction.atomic():
+            org.parents.add(leder)
+        with self.assertRaises(ValidationError), transaction.atomic():
+            dev.parents.add(dev)
+        with self.assertRaises(ValidationError), transaction.atomic():
+            leder.sub_groups.add(org)
+
+    def test_hierarchy_changes(self):
+        org = InheritanceGroup.objects.get(name='Org')
+        dev = InheritanceGroup.objects.get(name='Dev')
+        leder = InheritanceGroup.objects.get(name='Leder')
+        web = InheritanceGroup.objects.create(name='Web')
+        org.sub_groups.add(web)
+        dev.sub_groups.add(web)
+
+        self.assertIn(web, org.get_sub_groups())
+        self.assertIn(web, dev.get_sub_groups())
+
+        web.parents.remove(org)
+        self.assertIn(org, web.get_all_parents())
+
+        dev.sub_groups.clear()
+        self.assertNotIn(dev, web.get_all_parents())
+        self.assertNotIn(dev, leder.get_all_parents())
+        self.assertIn(org, leder.get_all_parents())
+
+        org.delete()
+        self.assertEqual(leder.get_all_parents().count(), 2)
+
+    def test_update_only_changed_permissions(self):
+        org = InheritanceGroup.objects.get(name='Org')
+        leder = InheritanceGroup.objects.get(name='Leder')
+        perm1 = Permission.objects.get(codename='perm1')
+        perm2 = Permission.objects.get(codename='perm2')
+        through = Group.permissions.through
+
+        org.own_permissions.add(perm1)
+        row = through.objects.get(group=leder, permission=perm1)
+
+        org.own_permissions.add(perm2)
+        self.assertTrue(through.objects.filter(pk=row.pk).exists())
+        self.assertIn(perm2, leder.permissions.all())
+
+        # Nothing is written when the permissions are up to date
+        with self.assertNumQueries(4):
+            org.update_permissions()
+
+        org.own_permissions.remove(perm2)
+        self.assertNotIn(perm2, leder.permissions.all())
+        self.assertTrue(through.objects.filter(pk=row.pk).exists())
+
+    def test_delete_parent(self):
+        org = InheritanceGroup.objects.get(name='Org')
+        leder = InheritanceGroup.objects.get(name='Leder')
+        perm1 = Permission.objects.get(codename='perm1')
+
+        org.own_permissions.add(perm1)
+        self.assertIn(perm1, leder.permissions.all())
+
+        org.delete()
+        self.assertNotIn(perm1, leder.permissions.all())
+
+    def test_hierarchy_queries(self):
+        dev = InheritanceGroup.objects.get(name='Dev')
+
+        with self.assertNumQueries(1):
+            list(dev.get_sub_groups())
+        with self.assertNumQueries(1):
+            list(dev.get_all_parents())
+        with self.assertNumQueries(1):
+            list(dev.get_available_parents())
+
 
 class BoardPositionTestCase(TestCase):
     def test_str(self):
@@ -389,7 +659,9 @@ class BoardPositionTestCase(TestCase):
         self.assertEqual(new_holder in group, True)
 
 
-class MemberListTestCase(TestCase):
+class MemberListTestCase(TransactionTestCase):
+    # Permissions are only cached outside of transactions
+
     def setUp(self):
         self.member1 = generate_member(first_name="aadne")
         self.member2 = generate_member(first_name="abalo")
@@ -415,6 +687,47 @@ class MemberListTestCase(TestCase):
             set(response.context["members"]),
             set([self.member1, self.member3]))
 
+    def test_sections(self):
+        response = self.client.get(reverse("member_list"))
+        sections = ''.join(response.context["sections"])
+        self.assertIn(self.member1.get_full_name(), sections)
+        self.assertNotIn(self.member2.get_full_name(), sections)
+        self.assertNotIn(reverse('member_change', args=[self.member1.pk]), sections)
+
+        response = self.client.get(reverse("member_list_all"))
+        self.assertIn(self.member2.get_full_name(), ''.join(response.context["sections"]))
+
+    def test_cache(self):
+        self.client.get(reverse("member_list"))
+        with self.assertNumQueries(3):
+            # The session, the user and the instruments
+            response = self.client.get(reverse("member_list"))
+        self.assertIn(self.member1.get_full_name(), ''.join(response.context["sections"]))
+
+        self.member1.first_name = 'aasmund'
+        self.member1.save()
+        response = self.client.get(reverse("member_list"))
+        self.assertIn('aasmund', ''.join(response.context["sections"]))
+
+        # Saving fields that are not shown keeps the cache
+        self.member1.last_login = timezone.now()
+        self.member1.save()
+        with self.assertNumQueries(3):
+            self.client.get(reverse("member_list"))
+
+        Instrument.objects.filter(pk=self.member1.instrument_id).update(name='Tuba')
+        Instrument.objects.get(pk=self.member1.instrument_id).save()
+        response = self.client.get(reverse("member_list"))
+        self.assertIn('<h2>Tuba</h2>', ''.join(response.context["sections"]))
+
+    def test_cache_permission_variant(self):
+        self.client.get(reverse("member_list"))
+
+        self.member1.user_permissions.add(Permission.objects.get(codename='change_member'))
+        response = self.client.get(reverse("member_list"))
+        self.assertIn(reverse('member_change', args=[self.member1.pk]),
+                      ''.join(response.context["sections"]))
+
 
 class MemberAddFormTestCase(TestCase):
     def test_memberShipPeriod_added(self):
@@ -516,3 +829,62 @@ class ChangeMemberTestCase(TestCase):
 
         response = self.client.post(reverse("member_change", args=[member.pk]), post_data)
         self.assertEqual(response.status_code, 302)  # form is valid and user is redirected
+
+
+class MemberApiTestCase(TestCase):
+    def setUp(self):
+        self.members = [generate_member() for i in range(5)]
+        self.members[3].is_active = False
+        self.members[3].save()
+        self.client.force_login(self.members[0])
+
+    def get(self, **params):
+        response = self.client.get(reverse('member_api'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages(self):
+        active = [member.pk for member in self.members if member.is_active]
+
+        data = self.get(limit=2)
+        self.assertEqual([member['id'] for member in data['results']], active[:2])
+        self.assertEqual(set(data['results'][0]),
+                         {'id', 'first_name', 'last_name', 'phone', 'instrument'})
+
+        pks = [member['id'] for member in data['results']]
+        while data['next']:
+            response = self.client.get(data['next'])
+            data = response.json()
+            pks += [member['id'] for member in data['results']]
+        self.assertEqual(pks, active)
+
+    def test_query_count(self):
+        # The session, the user and the page
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('member_api'), {'after': self.members[1].pk})
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_fields(self):
+        data = self.get(fields='id,email')
+        self.assertEqual(data['results'][0],
+                         {'id': self.members[0].pk, 'email': self.members[0].email})
+
+        response = self.client.get(reverse('member_api'), {'fields': 'first_name,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.json()['errors'])
+
+    def test_filters(self):
+        self.assertEqual([member['id'] for member in self.get(status='quit')['results']],
+                         [self.members[3].pk])
+        self.assertEqual(len(self.get(status='all')['results']), 5)
+
+        group = PercussionGroup.objects.create(leader=self.members[2])
+        Member.objects.filter(pk=self.members[2].pk).update(percussion_group=group)
+        self.assertEqual([member['id'] for member in
+                          self.get(percussion_group=group.pk)['results']],
+                         [self.members[2].pk])
+
+        instrument = self.members[4].instrument
+        self.assertEqual({member['id'] for member in self.get(instrument=instrument.pk)['results']},
+                         {member.pk for member in self.members
+                          if member.instrument == instrument and member.is_active})
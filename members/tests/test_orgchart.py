@@ -0,0 +1,88 @@
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from ..models import BoardPosition, Committee
+from ..orgchart import get_orgchart, get_cached_orgchart
+from .utils import generate_member
+
+
+class OrgchartTestCase(TransactionTestCase):
+    # Changes to committees invalidate the cache when the transaction is committed
+
+    def setUp(self):
+        self.leader = generate_member(first_name='Leder')
+        self.members = [generate_member() for i in range(3)]
+        self.committee = Committee.objects.create(
+            name='Com1', email='com1@example.com', leader=self.leader, leader_title='Sjef')
+        self.committee.add_members({self.members[0]: 'Sekretær', self.members[1]: 'Kasserer'})
+        self.position = BoardPosition.objects.create(
+            name='Leder', holder=self.members[2], email='leder@example.com')
+
+    def names(self, committee):
+        return [(membership['title'], membership['member']['name'])
+                for membership in committee['memberships']]
+
+    def test_orgchart(self):
+        with self.assertNumQueries(3):
+            orgchart = get_orgchart()
+
+        self.assertEqual(orgchart['board_positions'], [{
+            'name': 'Leder',
+            'holder': {
+                'name': self.members[2].get_full_name(),
+                'url': self.members[2].get_absolute_url(),
+            },
+        }])
+
+        committee, = orgchart['committees']
+        self.assertEqual(committee['pk'], self.committee.pk)
+        self.assertEqual(committee['leader_title'], 'Sjef')
+        self.assertEqual(committee['leader']['name'], self.leader.get_full_name())
+        self.assertEqual(self.names(committee), [
+            ('Sekretær', self.members[0].get_full_name()),
+            ('Kasserer', self.members[1].get_full_name()),
+        ])
+
+    def test_query_count(self):
+        for i in range(5):
+            committee = Committee.objects.create(
+                name=f'Com{i + 2}', email=f'com{i + 2}@example.com', leader=generate_member())
+            committee.add_members([generate_member() for j in range(3)])
+
+        with self.assertNumQueries(3):
+            get_orgchart()
+
+    def test_cache_invalidated(self):
+        get_cached_orgchart()
+        with self.assertNumQueries(0):
+            get_cached_orgchart()
+
+        self.committee.add_member(self.members[2], 'Medlem')
+        self.assertEqual(len(get_cached_orgchart()['committees'][0]['memberships']), 3)
+
+        self.committee.remove_member(self.members[0])
+        self.assertEqual(len(get_cached_orgchart()['committees'][0]['memberships']), 2)
+
+        self.members[1].first_name = 'Nytt'
+        self.members[1].save()
+        self.assertIn(('Kasserer', self.members[1].get_full_name()),
+                      self.names(get_cached_orgchart()['committees'][0]))
+
+        # Fields that are not shown keep the cache
+        self.members[1].phone = '12345678'
+        self.members[1].save(update_fields=['phone'])
+        with self.assertNumQueries(0):
+            get_cached_orgchart()
+
+        self.position.delete()
+        self.assertEqual(get_cached_orgchart()['board_positions'], [])
+
+        self.committee.delete()
+        self.assertEqual(get_cached_orgchart()['committees'], [])
+
+    def test_view(self):
+        self.client.force_login(self.leader)
+        response = self.client.get(reverse('practical'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.members[0].get_full_name())
+        self.assertContains(response, 'Sjef')
@@ -1,4 +1,11 @@
-from django.test import TestCase, Client
+import json
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import Permission
 from django.urls import reverse
 
@@ -7,6 +14,47 @@ from ..models import Member, PercussionGroup
 from .utils import generate_member
 
 
+class PercussionGroupTestCase(TestCase):
+    def test_numbering(self):
+        groups = [PercussionGroup.objects.create() for i in range(4)]
+        self.assertEqual([group.name for group in groups],
+                         ['Gruppe 1', 'Gruppe 2', 'Gruppe 3', 'Gruppe 4'])
+
+        with CaptureQueriesContext(connection) as queries:
+            groups[1].delete()
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual([(group.pk, group.number) for group in PercussionGroup.objects.all()],
+                         [(groups[0].pk, 1), (groups[2].pk, 2), (groups[3].pk, 3)])
+
+        # The stale number of a loaded group doesn't matter
+        groups[2].delete()
+        self.assertEqual([group.name for group in PercussionGroup.objects.all()],
+                         ['Gruppe 1', 'Gruppe 2'])
+        self.assertEqual(PercussionGroup.objects.create().name, 'Gruppe 3')
+
+    def test_number_taken(self):
+        PercussionGroup.objects.create()
+        aggregate = QuerySet.aggregate
+
+        def stale_aggregate(queryset, *args, **kwargs):
+            # The first read misses the group, like one created at the same time
+            patcher.stop()
+            return {'number__max': None}
+
+        patcher = mock.patch.object(QuerySet, 'aggregate', stale_aggregate)
+        patcher.start()
+        group = PercussionGroup.objects.create()
+
+        self.assertIs(QuerySet.aggregate, aggregate)
+        self.assertEqual(group.number, 2)
+        self.assertEqual(list(PercussionGroup.objects.values_list('number', flat=True)), [1, 2])
+
+    def test_ordering(self):
+        groups = [PercussionGroup.objects.create() for i in range(11)]
+        self.assertEqual(list(PercussionGroup.objects.all()), groups)
+
+
 class PercussionGroupListTestCase(TestCase):
     def test_get_list(self):
         member1 = generate_member()
@@ -115,3 +163,166 @@ class ChangePercussionGroupTestCase(TestCase):
         post_data = {'leader': [str(member1.pk)]}  # should also contain members[]
         self.client.post(reverse("percussion_group_change", args=[percussion_group.pk]), post_data)
         self.assertEqual(response.status_code, 404)
+
+
+class ReassignPercussionGroupsTestCase(TestCase):
+    def setUp(self):
+        self.members = [generate_member() for i in range(6)]
+        self.group1 = PercussionGroup.objects.create()
+        self.group2 = PercussionGroup.objects.create()
+        self.group3 = PercussionGroup.objects.create()
+
+        m = self.members
+        Member.objects.filter(pk__in=[m[0].pk, m[1].pk]).update(percussion_group=self.group1)
+        Member.objects.filter(pk__in=[m[2].pk, m[3].pk]).update(percussion_group=self.group2)
+        PercussionGroup.objects.filter(pk=self.group1.pk).update(leader=m[0])
+        PercussionGroup.objects.filter(pk=self.group2.pk).update(leader=m[2])
+
+    def assignments(self):
+        return {group: (leader, set(members)) for group, (leader, members)
+                in PercussionGroup.get_assignments().items()}
+
+    def test_reassign(self):
+        m = [member.pk for member in self.members]
+        # Swap the leaders of group 1 and 2, move one member to group 3,
+        # and remove one member from all groups
+        changes = PercussionGroup.reassign({
+            self.group1.pk: (m[2], [m[1]]),
+            self.group2.pk: (m[0], [m[0]]),
+            self.group3.pk: (None, [m[4]]),
+        })
+
+        self.assertEqual(self.assignments(), {
+            self.group1.pk: (m[2], {m[1], m[2]}),
+            self.group2.pk: (m[0], {m[0]}),
+            self.group3.pk: (None, {m[4]}),
+        })
+        self.assertEqual(changes, {
+            'members': {
+                m[0]: (self.group1.pk, self.group2.pk),
+                m[2]: (self.group2.pk, self.group1.pk),
+                m[3]: (self.group2.pk, None),
+                m[4]: (None, self.group3.pk),
+            },
+            'leaders': {
+                self.group1.pk: (m[0], m[2]),
+                self.group2.pk: (m[2], m[0]),
+            },
+        })
+
+    def test_no_changes(self):
+        groups = PercussionGroup.get_assignments()
+        with self.assertNumQueries(4):
+            # The savepoint, lock the groups, and read the members
+            changes = PercussionGroup.reassign(groups)
+        self.assertEqual(changes, {'members': {}, 'leaders': {}})
+
+    def test_invalid(self):
+        m = [member.pk for member in self.members]
+        before = self.assignments()
+
+        for groups in [
+                {self.group1.pk: (None, [m[0]]), self.group2.pk: (None, [m[0]])},
+                {self.group1.pk: (m[0], []), self.group2.pk: (m[0], [])},
+                {self.group1.pk: (None, [m[0]]), 0: (None, [m[1]])},
+                {self.group1.pk: (None, [m[0], 0])}]:
+            with self.assertRaises(ValidationError):
+                PercussionGroup.reassign(groups)
+            self.assertEqual(self.assignments(), before)
+
+    def test_view(self):
+        m = [member.pk for member in self.members]
+        url = reverse('percussion_group_reassign')
+        data = {'groups': [
+            {'id': self.group1.pk, 'leader': m[1], 'members': [m[1]]},
+            {'id': self.group2.pk, 'leader': None, 'members': [m[2], m[3], m[5]]},
+        ]}
+
+        self.client.force_login(self.members[5])
+        response = self.client.post(url, json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+        self.members[5].user_permissions.add(
+            Permission.objects.get(codename="change_percussion_group"))
+        response = self.client.post(url, json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(response.json()['next'], reverse('percussion_group_list'))
+        self.assertEqual(response.json()['changes']['members'],
+                         {str(m[0]): [self.group1.pk, None], str(m[5]): [None, self.group2.pk]})
+        self.assertEqual(self.assignments()[self.group2.pk], (None, {m[2], m[3], m[5]}))
+
+        next_url = reverse('percussion_group_change', args=[self.group1.pk])
+        response = self.client.post(url + '?next=' + next_url, json.dumps(data),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['next'], next_url)
+
+        response = self.client.post(url + '?next=https://example.com/', json.dumps(data),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['next'], reverse('percussion_group_list'))
+
+        response = self.client.post(url, 'nonsense', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        data['groups'][0]['members'].append(m[2])
+        response = self.client.post(url, json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
+
+
+class PercussionGroupRosterTestCase(TransactionTestCase):
+    # Permissions are only cached outside of transactions
+
+    def setUp(self):
+        self.member = generate_member(first_name='Bob')
+        self.member.user_permissions.add(
+            Permission.objects.get(codename="change_percussion_group"))
+        self.client.force_login(self.member)
+
+        self.groups = [PercussionGroup.objects.create() for i in range(25)]
+        Member.objects.bulk_create([
+            Member(email='medlem%d@example.com' % i, first_name='Medlem', last_name=str(i),
+                   instrument=self.member.instrument, birthday=self.member.birthday,
+                   percussion_group=self.groups[i % 30] if i % 30 < 25 else None,
+                   is_on_leave=i % 7 == 0)
+            for i in range(500)
+        ])
+        for group in self.groups:
+            group.leader = group.members.order_by('-pk').first()
+            group.save()
+
+    def test_roster(self):
+        with self.assertNumQueries(2):
+            groups, unassigned = PercussionGroup.objects.roster()
+
+        self.assertEqual(groups, self.groups)
+        for group in groups:
+            self.assertEqual(group.roster[0], group.leader)
+            self.assertEqual(set(group.roster), set(group.members.all()))
+            self.assertEqual([member.is_percussion_group_leader for member in group.roster],
+                             [True] + [False] * (len(group.roster) - 1))
+            on_leave = [member.is_on_leave for member in group.roster[1:]]
+            self.assertEqual(on_leave, sorted(on_leave))
+
+        self.assertEqual(set(unassigned), set(Member.objects.filter(percussion_group=None)))
+
+    def test_list_queries(self):
+        # The session, the user, the groups and the members
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('percussion_group_list'))
+        self.assertContains(response, 'Gruppe 25')
+
+    def test_change_queries(self):
+        # Fill the permission cache
+        self.client.get(reverse('percussion_group_change', args=[self.groups[3].pk]))
+
+        # The session, the user, the groups and the members
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('percussion_group_change',
+                                               args=[self.groups[3].pk]))
+        self.assertEqual(response.context['group'], self.groups[3])
+        self.assertEqual(len(response.context['other_groups']), 24)
+        self.assertContains(response, "checked='checked'", count=self.groups[3].members.count() + 1)
+
+        response = self.client.get(reverse('percussion_group_change', args=[0]))
+        self.assertEqual(response.status_code, 404)
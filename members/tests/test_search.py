@@ -0,0 +1,84 @@
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.six import StringIO
+
+from .. import search
+from ..models import Member, Instrument
+from .utils import generate_member
+
+
+class SearchTestCase(TestCase):
+    def setUp(self):
+        # The index is not emptied when a TransactionTestCase flushes the
+        # database, so it can have members of earlier tests
+        search.rebuild_index()
+
+        self.tuba = Instrument.objects.create(name='Tuba')
+        self.flute = Instrument.objects.create(name='Fløyte')
+        self.asmund = generate_member(first_name='Åsmund', last_name='Ødegård',
+                                      email='medlem1@example.com', instrument=self.tuba,
+                                      city='Trondheim')
+        self.asa = generate_member(first_name='Asa', last_name='Berg',
+                                   email='medlem2@example.com', instrument=self.flute)
+        self.asa.occupation = 'Kjemi'
+        self.asa.save()
+        self.sunniva = generate_member(first_name='Sunniva', last_name='Bråten',
+                                       email='medlem3@example.com', instrument=self.flute)
+        self.sunniva.about_me = 'Spiller også tuba på fritiden'
+        self.sunniva.save()
+
+    def test_search(self):
+        self.assertEqual(search.search('åsmund'), [self.asmund])
+        self.assertEqual(search.search('ÅSMUND ødeg'), [self.asmund])
+        self.assertEqual(search.search('trondheim'), [self.asmund])
+        self.assertEqual(search.search('kjem'), [self.asa])
+        self.assertEqual(search.search(''), [])
+        self.assertEqual(search.search('"*)('), [])
+
+    def test_norwegian_letters(self):
+        # Letters with diacritics are not the same as those without
+        self.assertEqual(search.search('as'), [self.asa])
+        self.assertEqual(search.search('bråten'), [self.sunniva])
+        self.assertEqual(search.search('braten'), [])
+
+    def test_ranking(self):
+        # The instrument of a member ranks above a mention in the description
+        self.assertEqual(search.search('tuba'), [self.asmund, self.sunniva])
+
+    def test_sync(self):
+        self.asa.first_name = 'Åse'
+        self.asa.save()
+        self.assertEqual(search.search('åse'), [self.asa])
+        self.assertEqual(search.search('asa'), [])
+
+        self.tuba.name = 'Sousafon'
+        self.tuba.save()
+        self.assertEqual(search.search('sousafon'), [self.asmund])
+
+        self.asmund.delete()
+        self.assertEqual(search.search('åsmund'), [])
+
+    def test_rebuild(self):
+        Member.objects.filter(pk=self.asa.pk).update(first_name='Åse')
+        self.assertEqual(search.search('åse'), [])
+
+        out = StringIO()
+        call_command('rebuildmembersearch', stdout=out)
+        self.assertEqual(search.search('åse'), [self.asa])
+
+    def test_fallback(self):
+        self.assertEqual(list(search.fallback_search(['berg'])), [self.asa])
+
+    def test_view(self):
+        self.client.force_login(self.asa)
+        with self.assertNumQueries(4):
+            # The session, the user, the index and the members
+            response = self.client.get(reverse('member_search'), {'q': 'ødegå'})
+
+        self.assertEqual(response.json()['results'], [{
+            'id': self.asmund.pk,
+            'name': 'Åsmund Ødegård',
+            'instrument': 'Tuba',
+            'url': self.asmund.get_absolute_url(),
+        }])
@@ -0,0 +1,228 @@
+from datetime import date
+
+from django.test import TestCase, TransactionTestCase
+from django.contrib.auth.models import Permission
+from django.urls import reverse
+
+from ..forms import MemberHeadcountForm
+from ..models import Member, MembershipPeriod, LeavePeriod
+from ..statistics import (TABLES, get_tables, get_buckets, count_buckets, get_headcount,
+                          get_cached_headcount)
+from .utils import generate_member
+
+
+class StatisticsTestCase(TestCase):
+    def setUp(self):
+        self.start = date(2018, 1, 1)
+        self.end = date(2018, 6, 30)
+
+        # generate_member starts a membership period on 2017-01-01
+        self.old = generate_member()
+        self.quit = generate_member()
+        self.quit.membership_periods.update(end=date(2018, 3, 1))
+        self.new = generate_member()
+        self.new.membership_periods.update(start=date(2018, 2, 1))
+        self.short = generate_member()
+        self.short.membership_periods.update(start=date(2018, 2, 1), end=date(2018, 5, 1))
+        self.gone = generate_member()
+        self.gone.membership_periods.update(end=date(2017, 6, 1))
+
+        LeavePeriod.objects.bulk_create([
+            LeavePeriod(member=self.old, start=date(2017, 12, 1), end=date(2018, 2, 1)),
+            LeavePeriod(member=self.new, start=date(2018, 4, 1), end=None),
+            LeavePeriod(member=self.quit, start=date(2017, 12, 1), end=date(2018, 8, 1)),
+            LeavePeriod(member=self.short, start=date(2018, 3, 1), end=date(2018, 4, 1)),
+        ])
+
+    def names(self, table):
+        return {row[0] for row in table['rows']}
+
+    def test_tables(self):
+        with self.assertNumQueries(2):
+            tables = get_tables(self.start, self.end, list(TABLES))
+        tables = {table['name']: table for table in tables}
+
+        self.assertEqual(list(tables), list(TABLES))
+        self.assertEqual(self.names(tables['members_start']),
+                         {self.old.get_full_name(), self.quit.get_full_name()})
+        self.assertEqual(self.names(tables['members_end']),
+                         {self.old.get_full_name(), self.new.get_full_name()})
+        self.assertEqual(self.names(tables['new']), {self.new.get_full_name()})
+        self.assertEqual(self.names(tables['quit']),
+                         {self.quit.get_full_name(), self.short.get_full_name()})
+        self.assertEqual(self.names(tables['joined_quit']), {self.short.get_full_name()})
+        self.assertEqual(self.names(tables['leave_start']), {self.old.get_full_name()})
+        self.assertEqual(self.names(tables['leave_end']), {self.new.get_full_name()})
+        self.assertEqual(self.names(tables['leave_whole']), {self.quit.get_full_name()})
+        self.assertEqual(self.names(tables['leave_part']), {self.short.get_full_name()})
+
+        self.assertEqual(tables['new']['rows'], [[self.new.get_full_name(), date(2018, 2, 1)]])
+        for table in tables.values():
+            self.assertEqual(table['num'], len(table['rows']))
+
+    def test_single_model(self):
+        with self.assertNumQueries(1):
+            tables = get_tables(self.start, self.end, ['new', 'quit'])
+        self.assertEqual([table['name'] for table in tables], ['new', 'quit'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_tables(self.start, self.end, []), [])
+
+    def test_ordering(self):
+        table = get_tables(self.start, self.end, ['members_start'])[0]
+        expected = MembershipPeriod.objects.filter(member__in=[self.old, self.quit])
+        self.assertEqual([row[1:] for row in table['rows']],
+                         [[period.start, period.end] for period in expected])
+
+    def test_view(self):
+        user = generate_member()
+        user.user_permissions.add(Permission.objects.get(codename='statistics'))
+        self.client.force_login(user)
+
+        data = {'start': self.start, 'end': self.end, 'new': 'on', 'leave_whole': 'on'}
+        response = self.client.get(reverse('member_statistics'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([table['name'] for table in response.context['tables']],
+                         ['Medlemmer som begynte denne perioden',
+                          'Medlemmer i permisjon i hele perioden'])
+
+    def get_export(self, fmt):
+        user = generate_member()
+        user.user_permissions.add(Permission.objects.get(codename='statistics'))
+        self.client.force_login(user)
+
+        data = {'start': self.start, 'end': self.end, 'new': 'on', 'leave_whole': 'on',
+                'joined_quit': 'on', fmt: ''}
+        response = self.client.get(reverse('member_statistics'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename="statistikk-2018-01-01--2018-06-30.csv"')
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv(self):
+        content = self.get_export('csv')
+        lines = content.splitlines()
+
+        self.assertEqual(lines[0], 'Medlemsstatistikk for perioden 2018-01-01 til 2018-06-30')
+        self.assertEqual(lines[3:8], [
+            'Medlemmer som begynte denne perioden',
+            'Navn,Startet',
+            '%s,2018-02-01' % self.new.get_full_name(),
+            'Totalt:,1',
+            '',
+        ])
+        self.assertIn('Medlemmer i permisjon i hele perioden', lines)
+        self.assertIn('%s,2017-12-01,2018-08-01' % self.quit.get_full_name(), lines)
+
+    def test_excel(self):
+        content = self.get_export('excel')
+        self.assertTrue(content.startswith('\ufeff'))
+        self.assertIn('Navn;Startet\r\n%s;2018-02-01' % self.new.get_full_name(), content)
+
+    def test_csv_empty_table(self):
+        LeavePeriod.objects.all().delete()
+        lines = self.get_export('csv').splitlines()
+        index = lines.index('Medlemmer i permisjon i hele perioden')
+        self.assertEqual(lines[index + 1], 'Ingen')
+
+
+class HeadcountTestCase(TransactionTestCase):
+    # The headcounts are only cached outside of transactions
+
+    def setUp(self):
+        # generate_member starts a membership period on 2017-01-01
+        self.members = [generate_member() for i in range(4)]
+        self.members[1].membership_periods.update(end=date(2017, 3, 15))
+        self.members[2].membership_periods.update(start=date(2017, 2, 10))
+        MembershipPeriod.objects.create(member=self.members[1], start=date(2017, 5, 1))
+        LeavePeriod.objects.create(member=self.members[3], start=date(2017, 2, 1),
+                                   end=date(2017, 4, 1))
+
+    def test_buckets(self):
+        self.assertEqual(get_buckets(date(2017, 1, 15), date(2017, 3, 1), 'month'),
+                         [date(2017, 1, 15), date(2017, 2, 1), date(2017, 3, 1)])
+        self.assertEqual(get_buckets(date(2017, 1, 1), date(2017, 1, 15), 'week'),
+                         [date(2017, 1, 1), date(2017, 1, 8), date(2017, 1, 15)])
+        self.assertEqual(len(get_buckets(date(2016, 1, 1), date(2016, 12, 31), 'day')), 366)
+
+    def test_count_buckets(self):
+        for start, end in [(date(2016, 1, 1), date(2016, 12, 31)),
+                           (date(2016, 1, 15), date(2018, 3, 1)),
+                           (date(2017, 2, 3), date(2017, 2, 3))]:
+            for interval in ['day', 'week', 'month']:
+                self.assertEqual(count_buckets(start, end, interval),
+                                 len(get_buckets(start, end, interval)))
+
+    def test_headcount(self):
+        with self.assertNumQueries(2):
+            headcount = get_headcount(date(2016, 12, 1), date(2017, 6, 30), 'month')
+
+        self.assertEqual(headcount['dates'][:2], [date(2016, 12, 1), date(2017, 1, 1)])
+        self.assertEqual(headcount['active'], [0, 3, 4, 3, 3, 4, 4])
+        self.assertEqual(headcount['on_leave'], [0, 0, 1, 1, 0, 0, 0])
+        self.assertEqual(headcount['joined'], [0, 3, 1, 0, 0, 1, 0])
+        self.assertEqual(headcount['quit'], [0, 0, 0, 1, 0, 0, 0])
+
+    def test_overlapping_periods(self):
+        # A member with overlapping or adjacent periods is counted once
+        MembershipPeriod.objects.create(member=self.members[0], start=date(2017, 3, 1),
+                                        end=date(2017, 4, 1))
+        MembershipPeriod.objects.create(member=self.members[1], start=date(2017, 3, 15),
+                                        end=date(2017, 4, 15))
+        headcount = get_headcount(date(2017, 1, 1), date(2017, 6, 30), 'month')
+
+        self.assertEqual(headcount['active'], [3, 4, 4, 3, 4, 4])
+        self.assertEqual(headcount['joined'], [3, 1, 0, 0, 1, 0])
+        self.assertEqual(headcount['quit'], [0, 0, 0, 1, 0, 0])
+
+    def test_daily_headcount(self):
+        start, end = date(2016, 12, 25), date(2017, 6, 1)
+        headcount = get_headcount(start, end, 'day')
+
+        for day, active, on_leave in zip(headcount['dates'], headcount['active'],
+                                         headcount['on_leave']):
+            self.assertEqual(active, Member.objects.active_on(day).count())
+            self.assertEqual(on_leave, Member.objects.on_leave_on(day).count())
+
+    def test_cache(self):
+        start, end = date(2017, 1, 1), date(2017, 12, 31)
+        get_cached_headcount(start, end, 'month')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cached_headcount(start, end, 'month')['active'][-1], 4)
+
+        self.members[0].membership_periods.get().delete()
+        self.assertEqual(get_cached_headcount(start, end, 'month')['active'][-1], 3)
+
+        LeavePeriod.objects.create(member=self.members[0], start=date(2017, 12, 1))
+        self.assertEqual(get_cached_headcount(start, end, 'month')['on_leave'][-1], 1)
+
+    def test_view(self):
+        user = generate_member()
+        url = reverse('member_headcount')
+        data = {'start': '2017-01-01', 'end': '2017-03-31', 'interval': 'month'}
+
+        self.client.force_login(user)
+        response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 403)
+
+        user.user_permissions.add(Permission.objects.get(codename='statistics'))
+        response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['dates'], ['2017-01-01', '2017-02-01', '2017-03-01'])
+        self.assertEqual(response.json()['active'], [4, 5, 4])
+
+        response = self.client.get(url, {'start': '2017-01-01', 'end': '2016-01-01'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('errors', response.json())
+
+    def test_form(self):
+        def is_valid(start, end, interval):
+            return MemberHeadcountForm({
+                'start': start, 'end': end, 'interval': interval}).is_valid()
+
+        self.assertTrue(is_valid('2017-01-01', '2019-09-27', 'day'))
+        self.assertFalse(is_valid('2017-01-01', '2019-09-28', 'day'))
+        self.assertTrue(is_valid('9950-01-01', '9998-12-31', 'month'))
+        self.assertFalse(is_valid('9999-01-01', '9999-12-31', 'month'))
+        self.assertFalse(is_valid('9900-01-01', '9998-12-31', 'month'))
@@ -6,6 +6,12 @@ urlpatterns = [
         {'show_all': False}, name='member_list'),
     path('alle', views.MemberList.as_view(),
         {'show_all': True}, name='member_list_all'),
+    path('api', views.MemberApi.as_view(),
+        name='member_api'),
+    path('sok', views.MemberSearch.as_view(),
+        name='member_search'),
     path('statistikk', views.MemberStatistics.as_view(),
         name='member_statistics'),
+    path('statistikk/antall', views.MemberHeadcount.as_view(),
+        name='member_headcount'),
 ]
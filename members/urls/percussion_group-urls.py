@@ -6,6 +6,8 @@ urlpatterns = [
         name='percussion_group_list'),
     path('ny', views.AddPercussionGroup.as_view(),
         name='percussion_group_add'),
+    path('endre', views.ReassignPercussionGroups.as_view(),
+        name='percussion_group_reassign'),
     path('<int:pk>/endre', views.ChangePercussionGroup.as_view(),
         name='percussion_group_change'),
     path('<int:pk>/slett', views.DeletePercussionGroup.as_view(),
@@ -1,23 +1,31 @@
-import csv
+import json
+from collections import defaultdict
 
-from django.db.models import Q
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.forms import modelform_factory
 from django.urls import reverse, reverse_lazy
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse, Http404, JsonResponse
-from django.views.generic import (DetailView, ListView, CreateView,
+from django.template.loader import render_to_string
+from django.utils.http import is_safe_url
+from django.utils.safestring import mark_safe
+from django.http import Http404, JsonResponse
+from django.views.generic import (View, DetailView, ListView, CreateView,
                                   UpdateView, TemplateView, RedirectView)
 from django.contrib.auth.mixins import (LoginRequiredMixin, PermissionRequiredMixin,
                                         UserPassesTestMixin)
 
-from utils.views import MultiFormView
+from utils.cache import can_cache
+from utils.views import MultiFormView, StreamingCSVResponse
 from base.models import EditableContent
 from base.widget import FancyCheckbox
 
-from .models import (Member, MembershipPeriod, LeavePeriod,
-                     Committee, PercussionGroup)
-from .forms import (MemberAddForm, MemberStatisticsForm,
-                    MembershipPeriodFormset, LeavePeriodFormset,
+from . import search, statistics
+from .memberlist import MEMBER_LIST_CACHE_TIMEOUT, get_section_key
+from .models import Member, Instrument, Committee, PercussionGroup
+from .forms import (MemberAddForm, MemberStatisticsForm, MemberHeadcountForm,
+                    MemberApiForm, MembershipPeriodFormset, LeavePeriodFormset,
                     CommitteeChangeForm, CommitteeMembershipFormset)
 
 
@@ -45,6 +53,10 @@ class MemberList(LoginRequiredMixin, ListView):
     The list is sorted by :model:`members.Instrument`, group leader,
     first name and last name.
 
+    The section for each instrument is rendered separately and cached,
+    for each combination of ``show_all`` and whether the user can
+    change members, by ``members.memberlist``.
+
     **Arguments**
 
     ``show_all``
@@ -55,6 +67,10 @@ class MemberList(LoginRequiredMixin, ListView):
     ``members``
         The list of :model:`members.Member`.
 
+    ``sections``
+        The rendered section for each :model:`members.Instrument`
+        with members.
+
     **Template**
 
     :template:`members/member_list.html`
@@ -69,12 +85,149 @@ class MemberList(LoginRequiredMixin, ListView):
             return Member.objects.filter(is_active=True).prefetch_related(
                     'instrument', 'board_position', 'group_leader_for')
 
+    def get_sections(self):
+        show_all = self.kwargs['show_all']
+        can_change = self.request.user.has_perm('members.change_member')
+
+        instruments = list(Instrument.objects.all())
+        keys = {instrument.pk: get_section_key(instrument, show_all, can_change)
+                for instrument in instruments}
+        sections = cache.get_many(keys.values())
+
+        missing = [instrument for instrument in instruments if keys[instrument.pk] not in sections]
+        if missing:
+            members = defaultdict(list)
+            for member in self.get_queryset()\
+                              .filter(instrument__in=missing)\
+                              .select_related('board_position', 'group_leader_for')\
+                              .prefetch_related(None):
+                members[member.instrument_id].append(member)
+
+            rendered = {}
+            for instrument in missing:
+                # Instruments without members have an empty section
+                rendered[keys[instrument.pk]] = render_to_string(
+                    'members/member_list_section.html', {
+                        'instrument': instrument,
+                        'members': members[instrument.pk],
+                        'can_change': can_change,
+                    }) if members[instrument.pk] else ''
+            if can_cache():
+                cache.set_many(rendered, MEMBER_LIST_CACHE_TIMEOUT)
+            sections.update(rendered)
+
+        return [mark_safe(sections[keys[instrument.pk]])
+                for instrument in instruments if sections[keys[instrument.pk]]]
+
     def get_context_data(self, **kwargs):
         context = super(MemberList, self).get_context_data(**kwargs)
         context['show_all'] = self.kwargs['show_all']
+        context['sections'] = self.get_sections()
         return context
 
 
+class MemberApi(LoginRequiredMixin, View):
+    """
+    Return a page of :model:`members.Member` as JSON.
+
+    The members are ordered by primary key, and paged by passing the last
+    primary key of one page as ``after`` to get the next, so every page
+    is a single indexed query however far into the list it is.
+
+    **GET parameters**
+
+    ``after``
+        Only return members with a greater primary key.
+
+    ``limit``
+        The number of members to return, at most 500. Defaults to 100.
+
+    ``fields``
+        A comma separated list of the fields to return, from
+        ``MemberApiForm.FIELDS``.
+
+    ``instrument``, ``percussion_group``
+        Only return the members of the given instrument or percussion group.
+
+    ``status``
+        ``active``, ``on_leave``, ``quit`` or ``all``. Defaults to ``active``.
+
+    **Result**
+
+    ``results``
+        A list with an object for each member, with the selected fields.
+
+    ``next``
+        The URL of the next page, or ``null`` if this is the last one.
+    """
+    STATUS_FILTERS = {
+        'active': {'is_active': True},
+        'on_leave': {'is_active': True, 'is_on_leave': True},
+        'quit': {'is_active': False},
+        'all': {},
+    }
+
+    def get(self, request):
+        form = MemberApiForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+
+        data = form.cleaned_data
+        fields = data['fields']
+        queryset = Member.objects.filter(**self.STATUS_FILTERS[data['status']])
+        if data['instrument']:
+            queryset = queryset.filter(instrument=data['instrument'])
+        if data['percussion_group']:
+            queryset = queryset.filter(percussion_group=data['percussion_group'])
+        if data['after'] is not None:
+            queryset = queryset.filter(pk__gt=data['after'])
+
+        # Fetch one more than the limit, to know if there is a next page
+        members = list(queryset.order_by('pk').values('pk', *fields)[:data['limit'] + 1])
+        next_url = None
+        if len(members) > data['limit']:
+            members = members[:data['limit']]
+            params = request.GET.copy()
+            params['after'] = members[-1]['pk']
+            next_url = '%s?%s' % (request.path, params.urlencode())
+
+        results = [{field: member[field] for field in fields} for member in members]
+        return JsonResponse({'results': results, 'next': next_url})
+
+
+class MemberSearch(LoginRequiredMixin, View):
+    """
+    Search for :model:`members.Member` by name, e-mail, instrument, city,
+    occupation and description, and return the best matches as JSON,
+    for autocompletion.
+
+    **GET parameters**
+
+    ``q``
+        The search query. Every word must match the start of a word.
+
+    **Result**
+
+    ``results``
+        A list of up to 10 members, with their ``id``, ``name``,
+        ``instrument`` and ``url``.
+    """
+    limit = 10
+
+    def get(self, request):
+        ids = search.search_ids(request.GET.get('q', ''), self.limit)
+        members = Member.objects.filter(pk__in=ids)\
+                                .values('pk', 'first_name', 'last_name', 'instrument__name')
+        members = {member['pk']: member for member in members}
+
+        return JsonResponse({'results': [{
+            'id': pk,
+            'name': '%s %s' % (members[pk]['first_name'], members[pk]['last_name']),
+            'instrument': members[pk]['instrument__name'],
+            'url': reverse('member_detail', args=[pk]),
+        } for pk in ids if pk in members]})
+
+
 class ChangeMember(UserPassesTestMixin, UpdateView):
     """
     Display a form to edit a :model:`members.Member`.
@@ -184,34 +337,10 @@ class MemberStatistics(PermissionRequiredMixin, TemplateView):
         if 'start' in request.GET:
             form = MemberStatisticsForm(request.GET)
             if form.is_valid():
-                context['tables'] = self.get_tables(form)
+                if 'csv' in request.GET or 'excel' in request.GET:
+                    return self.get_csv_response(form, excel='excel' in request.GET)
 
-                if 'csv' in request.GET:
-                    start = form.cleaned_data['start']
-                    end = form.cleaned_data['end']
-                    filename = 'statistikk-%s--%s' % (start, end)
-
-                    response = HttpResponse(content_type='text/csv')
-                    response['Content-Disposition'] = 'attachment; filename="%s"' % filename
-
-                    writer = csv.writer(response)
-                    writer.writerow(['Medlemsstatistikk for perioden %s til %s' % (start, end)])
-                    writer.writerow([])
-                    writer.writerow([])
-
-                    for table in context['tables']:
-                        writer.writerow([table['name']])
-                        if table['num']:
-                            writer.writerow(table['cols'])
-                            for row in table['rows']:
-                                writer.writerow(row)
-                            writer.writerow(['Totalt:', table['num']])
-                        else:
-                            writer.writerow(['Ingen'])
-                        writer.writerow([])
-                        writer.writerow([])
-
-                    return response
+                context['tables'] = self.get_tables(form)
         else:
             form = MemberStatisticsForm()
 
@@ -219,153 +348,66 @@ class MemberStatistics(PermissionRequiredMixin, TemplateView):
 
         return self.render_to_response(context)
 
-    def get_tables(self, form):
-        tables = []
+    def get_csv_response(self, form, excel=False):
+        """
+        Return the selected tables as a CSV file, streamed from the database
+        as it is written. With ``excel`` the file is formatted for Excel.
+        """
         start = form.cleaned_data['start']
         end = form.cleaned_data['end']
+        tables = [(name, form.fields[name].label)
+                  for name in statistics.TABLES if form.cleaned_data[name]]
 
-        if form.cleaned_data['members_start']:
-            table = {
-                'name': form.fields['members_start'].label,
-                'cols': ['Navn', 'Startet', 'Sluttet'],
-                'rows': [],
-                'num': 0,
-            }
+        return StreamingCSVResponse(statistics.iter_csv(start, end, tables),
+                                    'statistikk-%s--%s' % (start, end), excel=excel)
 
-            for period in MembershipPeriod.objects.filter(
-                    Q(end=None) | Q(end__gt=start), start__lt=start)\
-                    .prefetch_related('member'):
-                table['rows'].append([period.member.get_full_name(), period.start, period.end])
-                table['num'] += 1
-            tables.append(table)
-
-        if form.cleaned_data['members_end']:
-            table = {
-                'name': form.fields['members_end'].label,
-                'cols': ['Navn', 'Startet', 'Sluttet'],
-                'rows': [],
-                'num': 0,
-            }
+    def get_tables(self, form):
+        names = [name for name in statistics.TABLES if form.cleaned_data[name]]
+        tables = statistics.get_tables(form.cleaned_data['start'], form.cleaned_data['end'], names)
+        for table in tables:
+            table['name'] = form.fields[table['name']].label
+        return tables
 
-            for period in MembershipPeriod.objects.filter(
-                    Q(end=None) | Q(end__gt=end), start__lt=end)\
-                    .prefetch_related('member'):
-                table['rows'].append([period.member.get_full_name(), period.start, period.end])
-                table['num'] += 1
-            tables.append(table)
-
-        if form.cleaned_data['new']:
-            table = {
-                'name': form.fields['new'].label,
-                'cols': ['Navn', 'Startet'],
-                'rows': [],
-                'num': 0,
-            }
 
-            for period in MembershipPeriod.objects.filter(start__range=(start, end), end=None)\
-                    .prefetch_related('member'):
-                table['rows'].append([period.member.get_full_name(), period.start])
-                table['num'] += 1
-            tables.append(table)
-
-        if form.cleaned_data['quit']:
-            table = {
-                'name': form.fields['quit'].label,
-                'cols': ['Navn', 'Startet', 'Sluttet'],
-                'rows': [],
-                'num': 0,
-            }
+class MemberHeadcount(PermissionRequiredMixin, View):
+    """
+    Return the number of active members, members on leave, new members and
+    members who quit over time, as JSON.
 
-            for period in MembershipPeriod.objects.filter(end__range=(start, end))\
-                    .prefetch_related('member'):
-                table['rows'].append([period.member.get_full_name(), period.start, period.end])
-                table['num'] += 1
-            tables.append(table)
-
-        if form.cleaned_data['joined_quit']:
-            table = {
-                'name': form.fields['joined_quit'].label,
-                'cols': ['Navn', 'Startet', 'Sluttet'],
-                'rows': [],
-                'num': 0,
-            }
+    **GET parameters**
 
-            for period in MembershipPeriod.objects.filter(
-                    start__range=(start, end), end__range=(start, end))\
-                    .prefetch_related('member'):
-                table['rows'].append([period.member.get_full_name(), period.start, period.end])
-                table['num'] += 1
-            tables.append(table)
-
-        if form.cleaned_data['leave_start']:
-            table = {
-                'name': form.fields['leave_start'].label,
-                'cols': ['Navn', 'Gikk i permisjon', 'Gikk ut av permisjon'],
-                'rows': [],
-                'num': 0,
-            }
+    ``start``, ``end``
+        The range of dates to count, inclusive.
 
-            for period in LeavePeriod.objects.filter(start__lt=start, end__range=(start, end))\
-                    .prefetch_related('member'):
-                table['rows'].append([period.member.get_full_name(), period.start, period.end])
-                table['num'] += 1
-            tables.append(table)
-
-        if form.cleaned_data['leave_end']:
-            table = {
-                'name': form.fields['leave_end'].label,
-                'cols': ['Navn', 'Gikk i permisjon', 'Gikk ut av permisjon'],
-                'rows': [],
-                'num': 0,
-            }
+    ``interval``
+        The length of each step, either ``day``, ``week`` or ``month``.
+        Defaults to ``month``.
 
-            for period in LeavePeriod.objects\
-                    .filter(start__range=(start, end))\
-                    .filter(Q(end__gt=end) | Q(end=None))\
-                    .prefetch_related('member'):
-                table['rows'].append([period.member.get_full_name(), period.start, period.end])
-                table['num'] += 1
-            tables.append(table)
-
-        if form.cleaned_data['leave_whole']:
-            table = {
-                'name': form.fields['leave_whole'].label,
-                'cols': ['Navn', 'Gikk i permisjon', 'Gikk ut av permisjon'],
-                'rows': [],
-                'num': 0,
-            }
-
-            for period in LeavePeriod.objects.filter(
-                    start__lt=start, end__gt=end).prefetch_related('member'):
-                table['rows'].append([period.member.get_full_name(), period.start, period.end])
-                table['num'] += 1
-            tables.append(table)
-
-        if form.cleaned_data['leave_part']:
-            table = {
-                'name': form.fields['leave_part'].label,
-                'cols': ['Navn', 'Gikk i permisjon', 'Gikk ut av permisjon'],
-                'rows': [],
-                'num': 0,
-            }
+    See ``members.statistics.get_headcount`` for the format of the result.
+    """
+    permission_required = 'members.statistics'
 
-            for period in LeavePeriod.objects.filter(
-                    start__gte=start, end__lt=end).prefetch_related('member'):
-                table['rows'].append([period.member.get_full_name(), period.start, period.end])
-                table['num'] += 1
-            tables.append(table)
+    def get(self, request):
+        form = MemberHeadcountForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
 
-        return tables
+        return JsonResponse(statistics.get_cached_headcount(
+            form.cleaned_data['start'],
+            form.cleaned_data['end'],
+            form.cleaned_data['interval'],
+        ))
 
 
-class PercussionGroupList(LoginRequiredMixin, ListView):
+class PercussionGroupList(LoginRequiredMixin, TemplateView):
     """
     Display a list of all percussion groups, including members,
     and the members who don't have a group.
 
     **Context**
     ``groups``
-        A list of the percussion groups.
+        A list of the percussion groups, with their ``roster``.
+        See ``PercussionGroupQuerySet.roster()``.
 
     ``unassigned``
         A list of the members who are not assigned to a
@@ -375,17 +417,11 @@ class PercussionGroupList(LoginRequiredMixin, ListView):
 
     :model:`percussion_groups/list.html`
     """
-    context_object_name = 'groups'
     template_name = 'percussion_groups/list.html'
 
-    def get_queryset(self):
-        return PercussionGroup.objects.all().prefetch_related('members')
-
     def get_context_data(self, **kwargs):
         context = super(PercussionGroupList, self).get_context_data(**kwargs)
-        context['unassigned'] = Member.objects\
-                                      .filter(is_active=True, percussion_group=None)\
-                                      .order_by('is_on_leave', 'first_name', 'last_name')
+        context['groups'], context['unassigned'] = PercussionGroup.objects.roster()
         return context
 
 
@@ -424,10 +460,11 @@ class ChangePercussionGroup(PermissionRequiredMixin, TemplateView):
 
     **Context**
     ``group``
-        The group currently being edited.
+        The group currently being edited, with its ``roster``.
+        See ``PercussionGroupQuerySet.roster()``.
 
     ``other_groups``
-        A list of the other percussion groups.
+        A list of the other percussion groups, with their ``roster``.
 
     ``unassigned``
         A list of the members who are not assigned to a
@@ -445,23 +482,24 @@ class ChangePercussionGroup(PermissionRequiredMixin, TemplateView):
         if 'leader' not in request.POST or 'members[]' not in request.POST:
             raise Http404
 
-        leader = request.POST['leader']
         group = get_object_or_404(PercussionGroup, pk=pk)
-        group.leader_id = leader
-        group.save()
-
-        members = request.POST.getlist('members[]')
-        members.append(leader)
+        try:
+            leader = int(request.POST['leader'])
+            members = set(map(int, request.POST.getlist('members[]'))) | {leader}
+        except ValueError:
+            raise Http404
 
-        # Remove old members, and add new ones
-        Member.objects.filter(percussion_group=group).update(percussion_group=None)
-        Member.objects.filter(pk__in=members).update(percussion_group=group)
+        # Move the members from other groups, and remove them as leaders there
+        groups = PercussionGroup.get_assignments()
+        for other, (other_leader, other_members) in groups.items():
+            groups[other] = (None if other_leader in members else other_leader,
+                             [member for member in other_members if member not in members])
+        groups[group.pk] = (leader, list(members))
 
-        # If a member is the leader for another group, remove the leadership
-        PercussionGroup.objects\
-                       .exclude(pk=group.pk)\
-                       .filter(leader__percussion_group=group)\
-                       .update(leader=None)
+        try:
+            PercussionGroup.reassign(groups)
+        except ValidationError as e:
+            return JsonResponse({'success': False, 'error': ' '.join(e.messages)})
 
         return JsonResponse({
             'success': True,
@@ -470,18 +508,78 @@ class ChangePercussionGroup(PermissionRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super(ChangePercussionGroup, self).get_context_data(**kwargs)
-        context['group'] = get_object_or_404(PercussionGroup, pk=kwargs['pk'])
-        context['other_groups'] = PercussionGroup.objects\
-                                                 .exclude(pk=kwargs['pk'])\
-                                                 .prefetch_related('members')
-        context['unassigned'] = Member.objects\
-                                      .filter(is_active=True, percussion_group=None,
-                                              percussion_group_leader_for=None)\
-                                      .order_by('is_on_leave', 'first_name', 'last_name')
+        groups, context['unassigned'] = PercussionGroup.objects.roster()
+
+        context['other_groups'] = []
+        for group in groups:
+            if group.pk == kwargs['pk']:
+                context['group'] = group
+            else:
+                context['other_groups'].append(group)
+
+        if 'group' not in context:
+            raise Http404
 
         return context
 
 
+class ReassignPercussionGroups(PermissionRequiredMixin, View):
+    """
+    Assign all members to :model:`members.PercussionGroup`, and choose
+    the leader of each group, in one request.
+
+    The request body is JSON, on the form
+    ``{"groups": [{"id": <group>, "leader": <member>, "members": [<member>, ...]}, ...]}``.
+    Groups that are left out get no members, and members that are left out
+    are removed from their group. See ``PercussionGroup.reassign()``.
+
+    **GET parameters**
+
+    ``next``
+        The page to go to after the groups are changed. Defaults to the
+        list of groups.
+
+    **Result**
+
+    ``success``
+        Whether the groups were changed. If not, ``error`` describes why.
+
+    ``changes``
+        The moved members and the changed leaders, as returned by
+        ``PercussionGroup.reassign()``.
+
+    ``next``
+        The page to go to.
+    """
+    permission_required = 'members.change_percussion_group'
+    http_method_names = ['post']
+
+    def post(self, request):
+        try:
+            data = json.loads(request.body.decode('utf-8'))
+            groups = {
+                int(group['id']): (
+                    int(group['leader']) if group.get('leader') else None,
+                    [int(member) for member in group.get('members', [])],
+                )
+                for group in data['groups']
+            }
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return JsonResponse({'success': False, 'error': 'Ugyldig forespørsel.'}, status=400)
+
+        try:
+            changes = PercussionGroup.reassign(groups)
+        except ValidationError as e:
+            return JsonResponse({'success': False, 'error': ' '.join(e.messages)}, status=400)
+
+        next_url = request.GET.get('next')
+        if not is_safe_url(next_url, allowed_hosts={request.get_host()},
+                           require_https=request.is_secure()):
+            next_url = reverse('percussion_group_list')
+
+        return JsonResponse({'success': True, 'changes': changes, 'next': next_url})
+
+
 class ChangeCommittee(PermissionRequiredMixin, MultiFormView):
     """
     Display a form for editing a Committe.
@@ -505,5 +603,11 @@ class ChangeCommittee(PermissionRequiredMixin, MultiFormView):
     def get_committee_form_instance(self):
         return Committee.objects.get(pk=self.kwargs['pk'])
 
+    def post(self, *args, **kwargs):
+        # Save the committee and all the memberships in one transaction,
+        # so the members of the group are synced once, when it's committed
+        with transaction.atomic():
+            return super().post(*args, **kwargs)
+
     def get_formset_instance(self):
         return Committee.objects.get(pk=self.kwargs['pk'])
@@ -1,7 +1,7 @@
 from django.shortcuts import render
 from django.views.generic import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from members.models import (Committee, BoardPosition)
+from members.orgchart import get_cached_orgchart
 
 from base.models import EditableContent
 
@@ -18,10 +18,12 @@ class Practical(LoginRequiredMixin, TemplateView):
         The practical information.
 
     ``board_positions``
-        A list of board members.
+        A list of board positions and their holders.
 
     ``committees``
-        A list of committees.
+        A list of committees, with their leaders and members.
+
+    Both lists are from the cached snapshot in ``members.orgchart``.
 
     **Template**
 
@@ -33,7 +35,6 @@ class Practical(LoginRequiredMixin, TemplateView):
         context = super(Practical, self).get_context_data(**kwargs)
         context['content'] = EditableContent.objects.get_or_create(name='practical')[0].text
 
-        context['board_positions'] = BoardPosition.objects.all()
-        context['committees'] = Committee.objects.all()
+        context.update(get_cached_orgchart())
 
         return context
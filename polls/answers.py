@@ -0,0 +1,55 @@
+"""
+Answer a :model:`polls.Poll`, with one :model:`polls.PollAnswer` per member
+and poll, and keep the vote counts up to date.
+"""
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .models import PollAnswer
+
+
+def get_answer(poll, member):
+    """Return the option the member chose in the poll, or None, in one query."""
+    answer = PollAnswer.objects.filter(poll=poll, member=member)\
+                               .select_related('option')\
+                               .first()
+    return answer.option if answer else None
+
+
+@transaction.atomic
+def answer_poll(member, option):
+    """
+    Store that the member chose the option in its poll, replacing any
+    earlier answer to the poll.
+
+    The existing answer of the member is selected for update, which
+    locks it until the transaction ends. If there is none, a new answer
+    is created in a savepoint. If that fails with an IntegrityError,
+    another request answered for the member at the same time, so its
+    answer is locked and changed instead. Otherwise the locked answer is
+    saved with the new option, unless it already has it.
+
+    The member never has more than one answer to a poll, and the counts
+    stay correct when many members answer at the same time.
+
+    Raise ValidationError if the deadline of the poll has passed.
+    """
+    if option.poll.is_past_deadline:
+        raise ValidationError('Fristen for å svare på påmeldingen har gått ut.')
+
+    answers = PollAnswer.objects.select_for_update().filter(poll=option.poll_id, member=member)
+    answer = answers.first()
+
+    if answer is None:
+        try:
+            with transaction.atomic():
+                PollAnswer.objects.create(member=member, option=option)
+        except IntegrityError:
+            # The member answered the poll in another request at the same time
+            answer = answers.get()
+        else:
+            return
+
+    if answer.option_id != option.pk:
+        answer.option = option
+        answer.save()
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 
 class PollConfig(AppConfig):
-    name = 'poll'
+    name = 'polls'
+
+    def ready(self):
+        import polls.signals
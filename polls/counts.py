@@ -0,0 +1,73 @@
+"""
+Keep the vote counts of :model:`polls.PollOption` and
+:model:`polls.PollInstrumentCount` up to date.
+
+A vote is a pair of the primary keys of an option and the instrument of the
+member who chose it. The counts are changed with ``F()`` expressions, so
+concurrent votes don't overwrite each other.
+"""
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import PollOption, PollAnswer, PollInstrumentCount
+
+
+def get_votes(answers):
+    """Return the votes of the given queryset of :model:`polls.PollAnswer`."""
+    return list(answers.order_by().values_list('option', 'member__instrument'))
+
+
+def change_counts(votes, sign=1):
+    """
+    Add the given votes to the counts, or subtract them if ``sign`` is -1.
+
+    The vote count of every option changed by the same amount is changed in
+    one UPDATE, and each instrument count in one UPDATE, or an INSERT if
+    the first member of an instrument chose the option.
+    """
+    counts = Counter(votes)
+
+    options = Counter()
+    for (option, instrument), count in counts.items():
+        options[option] += count
+
+    by_count = defaultdict(list)
+    for option, count in options.items():
+        by_count[count].append(option)
+    for count, pks in by_count.items():
+        PollOption.objects.filter(pk__in=pks).update(vote_count=F('vote_count') + sign * count)
+
+    for (option, instrument), count in counts.items():
+        instrument_counts = PollInstrumentCount.objects.filter(option=option, instrument=instrument)
+        if instrument_counts.update(count=F('count') + sign * count) or sign < 0:
+            continue
+
+        try:
+            with transaction.atomic():
+                PollInstrumentCount.objects.create(option_id=option, instrument_id=instrument,
+                                                   count=count)
+        except IntegrityError:
+            # Another vote created the row first
+            instrument_counts.update(count=F('count') + count)
+
+
+@transaction.atomic
+def rebuild_counts():
+    """Count every vote again, and replace all the counts."""
+    votes = PollAnswer.objects.order_by()
+
+    PollInstrumentCount.objects.all().delete()
+    PollInstrumentCount.objects.bulk_create([
+        PollInstrumentCount(option_id=option, instrument_id=instrument, count=count)
+        for option, instrument, count in votes.values_list('option', 'member__instrument')
+                                              .annotate(count=Count('*'))
+    ])
+
+    option_votes = votes.filter(option=OuterRef('pk'))\
+                        .values('option')\
+                        .annotate(count=Count('*'))\
+                        .values('count')
+    PollOption.objects.update(vote_count=Coalesce(Subquery(option_votes), Value(0)))
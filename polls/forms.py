@@ -1,5 +1,6 @@
 from django import forms
 
+from .answers import get_answer, answer_poll
 from .models import Poll, PollOption
 
 
@@ -24,22 +25,19 @@ class PollAnswerForm(forms.Form):
         poll = kwargs.pop('poll')
         super(PollAnswerForm, self).__init__(*args, **kwargs)
 
+        self.poll = poll
         self.fields['options'].queryset = poll.options
 
         if poll.is_past_deadline:
             self.fields['options'].disabled = True
 
-        for option in poll.options.all():
-            if member in option.members.all():
-                self.fields['options'].initial = option
-                break
-        else:
-            self.fields['options'].initial = None
+        self.fields['options'].initial = get_answer(poll, member)
+
+    def clean(self):
+        if self.poll.is_past_deadline:
+            raise forms.ValidationError('Fristen for å svare på påmeldingen har gått ut.')
+        return super(PollAnswerForm, self).clean()
 
     def save(self, member):
         if self.is_valid():
-            for option in self.fields['options'].queryset.all():
-                option.members.remove(member)
-
-            option = self.cleaned_data['options']
-            option.members.add(member)
+            answer_poll(member, self.cleaned_data['options'])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from polls.counts import rebuild_counts
+
+
+class Command(BaseCommand):
+    help = 'Counts the votes of every poll again, and fixes the stored counts.'
+
+    def handle(self, *args, **options):
+        rebuild_counts()
+        self.stdout.write('Rebuilt the poll counts')
@@ -0,0 +1,50 @@
+# Generated by Django 2.1.5 on 2026-10-18 11:15
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def count_votes(apps, schema_editor):
+    PollOption = apps.get_model('polls', 'PollOption')
+    PollInstrumentCount = apps.get_model('polls', 'PollInstrumentCount')
+    votes = PollOption.members.through.objects.order_by()
+
+    PollInstrumentCount.objects.bulk_create([
+        PollInstrumentCount(option_id=option, instrument_id=instrument, count=count)
+        for option, instrument, count in votes.values_list('polloption', 'member__instrument')
+                                              .annotate(count=Count('*'))
+    ])
+    for option, count in votes.values_list('polloption').annotate(count=Count('*')):
+        PollOption.objects.filter(pk=option).update(vote_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0001_initial'),
+        ('polls', '0005_auto_20170723_1934'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='polloption',
+            name='vote_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='antall stemmer'),
+        ),
+        migrations.CreateModel(
+            name='PollInstrumentCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0, verbose_name='antall')),
+                ('instrument', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='members.Instrument', verbose_name='instrument')),
+                ('option', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='instrument_counts', to='polls.PollOption', verbose_name='valg')),
+            ],
+            options={
+                'verbose_name': 'antall per instrument',
+                'verbose_name_plural': 'antall per instrument',
+                'unique_together': {('option', 'instrument')},
+            },
+        ),
+        migrations.RunPython(count_votes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 2.1.5 on 2026-10-18 11:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def copy_answers(apps, schema_editor):
+    PollOption = apps.get_model('polls', 'PollOption')
+    PollAnswer = apps.get_model('polls', 'PollAnswer')
+
+    # A member could choose more than one option in the same poll,
+    # in which case the last choice is kept
+    answers = {}
+    votes = PollOption.members.through.objects.order_by('pk')
+    for option, poll, member in votes.values_list('polloption', 'polloption__poll', 'member'):
+        answers[poll, member] = option
+
+    PollAnswer.objects.bulk_create([
+        PollAnswer(poll_id=poll, member_id=member, option_id=option)
+        for (poll, member), option in answers.items()
+    ])
+
+    # Count the votes again, without the choices that weren't kept
+    PollInstrumentCount = apps.get_model('polls', 'PollInstrumentCount')
+    PollInstrumentCount.objects.all().delete()
+    PollInstrumentCount.objects.bulk_create([
+        PollInstrumentCount(option_id=option, instrument_id=instrument, count=count)
+        for option, instrument, count in PollAnswer.objects.order_by()
+                                                   .values_list('option', 'member__instrument')
+                                                   .annotate(count=Count('*'))
+    ])
+    PollOption.objects.update(vote_count=0)
+    for option, count in PollAnswer.objects.order_by().values_list('option')\
+                                                      .annotate(count=Count('*')):
+        PollOption.objects.filter(pk=option).update(vote_count=count)
+
+
+def copy_votes(apps, schema_editor):
+    PollOption = apps.get_model('polls', 'PollOption')
+    PollAnswer = apps.get_model('polls', 'PollAnswer')
+
+    PollOption.members.through.objects.bulk_create([
+        PollOption.members.through(polloption_id=option, member_id=member)
+        for option, member in PollAnswer.objects.values_list('option', 'member')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('polls', '0006_poll_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollAnswer',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='poll_answers', to=settings.AUTH_USER_MODEL, verbose_name='medlem')),
+                ('option', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='polls.PollOption', verbose_name='valg')),
+                ('poll', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='polls.Poll', verbose_name='påmelding')),
+            ],
+            options={
+                'verbose_name': 'svar',
+                'verbose_name_plural': 'svar',
+                'unique_together': {('poll', 'member')},
+            },
+        ),
+        migrations.RunPython(copy_answers, copy_votes),
+        migrations.RemoveField(
+            model_name='polloption',
+            name='members',
+        ),
+        migrations.AddField(
+            model_name='polloption',
+            name='members',
+            field=models.ManyToManyField(through='polls.PollAnswer', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from datetime import datetime
 
 from django.db import models
+from django.db.models import F
 from django.urls import reverse
 
 from members.models import Member, Instrument
@@ -40,8 +41,9 @@ class PollOption(models.Model):
     and the users that choose it.
     """
     poll = models.ForeignKey(Poll, related_name='options', on_delete=models.CASCADE)
-    members = models.ManyToManyField(Member)
+    members = models.ManyToManyField(Member, through='PollAnswer')
     title = models.CharField('tittel', max_length=20)
+    vote_count = models.IntegerField('antall stemmer', default=0, editable=False)
 
     class Meta:
         verbose_name = 'valg'
@@ -53,13 +55,84 @@ class PollOption(models.Model):
 
     def instruments(self):
         """
-        Return the amount of members of each instrument that chose this option.
+        Return the amount of members of each instrument that chose this option,
+        in one query. Use ``polls.tally.get_tally()`` to count every option of a poll.
         """
-        result = []
+        return list(self.instrument_counts.filter(count__gt=0)
+                                          .order_by('instrument__order', 'instrument__name')
+                                          .values('count', name=F('instrument__name')))
 
-        for instrument in Instrument.objects.all():
-            count = self.members.filter(instrument=instrument).count()
-            if count:
-                result.append({'name': instrument.name, 'count': count})
 
-        return result
+class PollAnswer(models.Model):
+    """
+    Store the :model:`polls.PollOption` a :model:`members.Member` chose in a
+    :model:`polls.Poll`.
+
+    A member has at most one answer per poll, and ``poll`` is always the
+    poll of ``option``. Use ``polls.answers`` to answer a poll. The vote
+    counts are kept up to date by the signals in ``polls.signals`` when
+    answers are saved or deleted, but not by bulk updates.
+    """
+    poll = models.ForeignKey(
+        Poll,
+        on_delete=models.CASCADE,
+        related_name='answers',
+        verbose_name='påmelding',
+    )
+    member = models.ForeignKey(
+        Member,
+        on_delete=models.CASCADE,
+        related_name='poll_answers',
+        verbose_name='medlem',
+    )
+    option = models.ForeignKey(
+        PollOption,
+        on_delete=models.CASCADE,
+        related_name='answers',
+        verbose_name='valg',
+    )
+
+    class Meta:
+        verbose_name = 'svar'
+        verbose_name_plural = 'svar'
+        unique_together = ('poll', 'member')
+
+    def __str__(self):
+        return '{}: {}'.format(self.member, self.option)
+
+    def save(self, *args, **kwargs):
+        """Save the answer, with the poll of its option."""
+        self.poll_id = self.option.poll_id
+        super(PollAnswer, self).save(*args, **kwargs)
+
+
+class PollInstrumentCount(models.Model):
+    """
+    Store the number of members of an :model:`members.Instrument`
+    that chose a :model:`polls.PollOption`.
+
+    The counts, and ``PollOption.vote_count``, are kept up to date by
+    ``polls.answers`` and the signals in ``polls.signals``, and can be
+    rebuilt with the ``rebuildpollcounts`` command.
+    """
+    option = models.ForeignKey(
+        PollOption,
+        on_delete=models.CASCADE,
+        related_name='instrument_counts',
+        verbose_name='valg',
+    )
+    instrument = models.ForeignKey(
+        Instrument,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='instrument',
+    )
+    count = models.IntegerField('antall', default=0)
+
+    class Meta:
+        verbose_name = 'antall per instrument'
+        verbose_name_plural = 'antall per instrument'
+        unique_together = ('option', 'instrument')
+
+    def __str__(self):
+        return '{}: {}'.format(self.option, self.count)
@@ -0,0 +1,60 @@
+from django.db.models.signals import pre_save, post_save, pre_delete
+from django.dispatch import receiver
+
+from members.models import Member
+from .counts import get_votes, change_counts
+from .models import PollAnswer
+from .tally import invalidate_results_cache
+
+
+@receiver(pre_save, sender=PollAnswer)
+def store_old_counts(sender, instance, **kwargs):
+    """Store the vote of an answer before it is changed."""
+    if instance._state.adding:
+        instance._old_votes = []
+    else:
+        instance._old_votes = get_votes(PollAnswer.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=PollAnswer)
+def update_counts(sender, instance, **kwargs):
+    """Count the vote of an answer that is created, or moved to another option."""
+    old_votes = getattr(instance, '_old_votes', [])
+    votes = get_votes(PollAnswer.objects.filter(pk=instance.pk))
+    if votes != old_votes:
+        change_counts(old_votes, -1)
+        change_counts(votes)
+        invalidate_results_cache([instance.poll_id])
+
+
+@receiver(pre_delete, sender=PollAnswer)
+def remove_counts(sender, instance, **kwargs):
+    # Counted before the answer is deleted, since the member might be deleted with it
+    change_counts(get_votes(PollAnswer.objects.filter(pk=instance.pk)), -1)
+    invalidate_results_cache([instance.poll_id])
+
+
+@receiver(pre_save, sender=Member)
+def move_counts(sender, instance, update_fields=None, **kwargs):
+    """Move the votes of a member to their new instrument."""
+    if instance._state.adding or (update_fields is not None and 'instrument' not in update_fields):
+        return
+    if not instance.has_changed('instrument'):
+        return
+
+    votes = get_votes(PollAnswer.objects.filter(member=instance))
+    change_counts(votes, -1)
+    change_counts([(option, instance.instrument_id) for option, instrument in votes])
+
+
+@receiver(pre_save, sender=Member)
+def update_results_cache(sender, instance, update_fields=None, **kwargs):
+    """Invalidate the results of the polls of a member whose name or instrument changes."""
+    fields = {'first_name', 'last_name', 'instrument'}
+    if instance._state.adding or (update_fields is not None and not fields & set(update_fields)):
+        return
+    if not any(instance.has_changed(field) for field in fields):
+        return
+
+    invalidate_results_cache(PollAnswer.objects.filter(member=instance)
+                                               .values_list('poll', flat=True))
@@ -16,3 +16,44 @@ $(document).ready(function() {
         update();
     });
 });
+
+// How often the results are fetched, in milliseconds
+var RESULTS_INTERVAL = 10000;
+
+function updateOption(option) {
+    var statistics = $('.statistics[data-option=' + option.pk + ']');
+
+    var table = statistics.find('table');
+    table.find('tr.instrument').remove();
+    $.each(option.tally, function(i, instrument) {
+        table.append(
+            $('<tr>').addClass('instrument')
+                .append($('<td>').text(instrument.name))
+                .append($('<td>').text(instrument.count)));
+    });
+
+    var list = statistics.find('ul').empty();
+    $.each(option.members, function(i, member) {
+        list.append($('<li>').attr('data-member', member.pk).text(member.name));
+    });
+}
+
+$(document).ready(function() {
+    var url = $('.statistics-container').data('results-url');
+    if (!url) {
+        return;
+    }
+
+    // New answers are fetched regularly, instead of being pushed to the page
+    setInterval(function() {
+        if (document.hidden) {
+            return;
+        }
+
+        $.getJSON(url, function(data) {
+            $.each(data.options, function(i, option) {
+                updateOption(option);
+            });
+        });
+    }, RESULTS_INTERVAL);
+});
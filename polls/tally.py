@@ -0,0 +1,120 @@
+"""
+The results of a :model:`polls.Poll`, counted per option and instrument.
+
+The counts are read from :model:`polls.PollInstrumentCount`, which is kept
+up to date as members vote, and the members who chose each option are
+loaded with one prefetch, independent of the number of options and instruments.
+
+The results sent to the statistics pages are cached per poll, so they are
+only counted once per change, however many pages are open. The cache of a
+poll is invalidated by ``invalidate_results_cache()``, which is called by
+the signals in ``polls.signals``.
+"""
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from members.models import Member
+from utils.cache import bump_version_on_commit, can_cache, versioned_key
+from .models import Poll, PollInstrumentCount
+
+
+RESULTS_CACHE = 'polls.results'
+RESULTS_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_counts(options):
+    """
+    Return a dict mapping the primary key of each of the given options to a
+    dict mapping instrument primary keys to the number of members of the
+    instrument that chose the option, in one query.
+
+    Instruments that no member chose are left out.
+    """
+    counts = defaultdict(dict)
+    rows = PollInstrumentCount.objects\
+        .filter(option__in=options, count__gt=0)\
+        .values_list('option', 'instrument', 'count')
+    for option, instrument, count in rows:
+        counts[option][instrument] = count
+    return counts
+
+
+def get_tally(poll):
+    """
+    Return a dict with the ``options`` of the poll and the ``instruments``
+    chosen by any member, in three queries.
+
+    Each option has ``tally``, a list of dicts with the ``name``
+    and ``count`` of each instrument with members who chose the option, in
+    the order of the instruments, and ``counts``, a list of the count for
+    each instrument in ``instruments``, which is 0 for instruments with no
+    members who chose it. The members of each option are prefetched.
+    """
+    options = list(poll.options.order_by('pk').prefetch_related(
+        Prefetch('members', queryset=Member.objects.select_related('instrument'))))
+    counts = get_counts(options)
+
+    chosen = {instrument for option_counts in counts.values() for instrument in option_counts}
+    instruments = sorted({member.instrument for option in options
+                          for member in option.members.all() if member.instrument_id in chosen},
+                         key=lambda instrument: (instrument.order, instrument.name))
+
+    for option in options:
+        option_counts = counts[option.pk]
+        option.counts = [option_counts.get(instrument.pk, 0) for instrument in instruments]
+        option.tally = [
+            {'name': instrument.name, 'count': option_counts[instrument.pk]}
+            for instrument in instruments if instrument.pk in option_counts
+        ]
+
+    return {
+        'options': options,
+        'instruments': instruments,
+    }
+
+
+def get_results(poll):
+    """
+    Return the results of the poll as plain values, with the ``pk``, the
+    ``vote_count``, the ``tally`` and the ``members``, with their ``pk``
+    and ``name``, of each of the ``options``. See ``get_tally()``.
+    """
+    return {'options': [{
+        'pk': option.pk,
+        'vote_count': option.vote_count,
+        'tally': option.tally,
+        'members': [{'pk': member.pk, 'name': member.get_full_name()}
+                    for member in option.members.all()],
+    } for option in get_tally(poll)['options']]}
+
+
+def get_results_cache(poll_pk):
+    """Return the name of the cached results of a poll."""
+    return '{}.{}'.format(RESULTS_CACHE, poll_pk)
+
+
+def get_cached_results(poll_pk):
+    """
+    Return ``get_results()`` of the poll with the given primary key, cached
+    until the answers to the poll change.
+
+    Raise ``Poll.DoesNotExist`` if there is no such poll.
+    """
+    key = versioned_key(get_results_cache(poll_pk))
+    results = cache.get(key)
+    if results is None:
+        results = get_results(Poll.objects.get(pk=poll_pk))
+        if can_cache():
+            cache.set(key, results, RESULTS_CACHE_TIMEOUT)
+    return results
+
+
+def invalidate_results_cache(poll_pks):
+    """
+    Invalidate the cached results of the polls with the given primary keys,
+    for the current transaction and when it is committed.
+    """
+    for poll_pk in set(poll_pks):
+        bump_version_on_commit(get_results_cache(poll_pk))
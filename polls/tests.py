@@ -1,3 +1,305 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from members.models import Instrument
+from members.tests.utils import generate_member
+from .answers import get_answer, answer_poll
+from .forms import PollAnswerForm
+from .models import Poll, PollOption, PollAnswer, PollInstrumentCount
+from .tally import get_tally, get_cached_results
+
+
+class PollTallyTestCase(TestCase):
+    def setUp(self):
+        self.poll = Poll.objects.create(title='Konsert')
+        self.yes = PollOption.objects.create(poll=self.poll, title='Ja')
+        self.no = PollOption.objects.create(poll=self.poll, title='Nei')
+
+        self.instruments = [Instrument.objects.create(name='Instrument %d' % i, order=i)
+                            for i in range(3)]
+        self.members = [generate_member(instrument=self.instruments[i % 2]) for i in range(5)]
+        for member in self.members[:3]:
+            answer_poll(member, self.yes)
+        for member in self.members[3:]:
+            answer_poll(member, self.no)
+
+    def test_tally(self):
+        with self.assertNumQueries(3):
+            tally = get_tally(self.poll)
+            yes, no = tally['options']
+            self.assertEqual(set(yes.members.all()), set(self.members[:3]))
+
+        self.assertEqual(tally['instruments'], self.instruments[:2])
+        self.assertEqual(yes.counts, [2, 1])
+        self.assertEqual(no.counts, [1, 1])
+        self.assertEqual(yes.tally, [
+            {'name': 'Instrument 0', 'count': 2},
+            {'name': 'Instrument 1', 'count': 1},
+        ])
+
+    def test_query_count(self):
+        for i in range(5):
+            option = PollOption.objects.create(poll=self.poll, title='Valg %d' % i)
+            answer_poll(generate_member(instrument=self.instruments[2]), option)
+
+        with self.assertNumQueries(3):
+            get_tally(self.poll)
+
+    def test_option_instruments(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.no.instruments(), [
+                {'name': 'Instrument 0', 'count': 1},
+                {'name': 'Instrument 1', 'count': 1},
+            ])
+
+    def test_view(self):
+        self.client.force_login(self.members[0])
+        response = self.client.get(reverse('poll_statistics', args=[self.poll.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.members[3].get_full_name())
+        self.assertEqual(response.context['options'], [self.yes, self.no])
+
+
+class PollCountsTestCase(TestCase):
+    def setUp(self):
+        self.poll = Poll.objects.create(title='Konsert')
+        self.option = PollOption.objects.create(poll=self.poll, title='Ja')
+        self.other = PollOption.objects.create(poll=self.poll, title='Nei')
+        self.instruments = [Instrument.objects.create(name='Instrument %d' % i, order=i)
+                            for i in range(2)]
+        self.members = [generate_member(instrument=self.instruments[i % 2]) for i in range(3)]
+
+    def counts(self):
+        return {
+            'votes': {option.pk: option.vote_count for option in PollOption.objects.all()},
+            'instruments': set(PollInstrumentCount.objects.filter(count__gt=0)
+                                                  .values_list('option', 'instrument', 'count')),
+        }
+
+    def assertCounts(self, votes, instruments):
+        self.assertEqual(self.counts(), {
+            'votes': {self.option.pk: votes[0], self.other.pk: votes[1]},
+            'instruments': instruments,
+        })
+
+    def test_answer(self):
+        for member in self.members:
+            answer_poll(member, self.option)
+        self.assertCounts((3, 0), {
+            (self.option.pk, self.instruments[0].pk, 2),
+            (self.option.pk, self.instruments[1].pk, 1),
+        })
+
+        answer_poll(self.members[0], self.other)
+        answer_poll(self.members[1], self.option)
+        self.assertCounts((2, 1), {
+            (self.option.pk, self.instruments[0].pk, 1),
+            (self.option.pk, self.instruments[1].pk, 1),
+            (self.other.pk, self.instruments[0].pk, 1),
+        })
+
+    def test_save_and_delete(self):
+        # The counts are kept through the answers themselves, not just answer_poll()
+        answers = [PollAnswer.objects.create(member=member, option=self.option)
+                   for member in self.members]
+        self.assertCounts((3, 0), {
+            (self.option.pk, self.instruments[0].pk, 2),
+            (self.option.pk, self.instruments[1].pk, 1),
+        })
+
+        answers[1].option = self.other
+        answers[1].save()
+        answers[2].save()
+        self.assertCounts((2, 1), {
+            (self.option.pk, self.instruments[0].pk, 2),
+            (self.other.pk, self.instruments[1].pk, 1),
+        })
+
+        answers[0].delete()
+        self.assertCounts((1, 1), {
+            (self.option.pk, self.instruments[0].pk, 1),
+            (self.other.pk, self.instruments[1].pk, 1),
+        })
+
+    def test_clear(self):
+        for member in self.members[:2]:
+            answer_poll(member, self.option)
+        answer_poll(self.members[2], self.other)
+
+        self.members[0].polloption_set.clear()
+        self.assertCounts((1, 1), {
+            (self.option.pk, self.instruments[1].pk, 1),
+            (self.other.pk, self.instruments[0].pk, 1),
+        })
+
+        self.option.members.clear()
+        self.assertCounts((0, 1), {(self.other.pk, self.instruments[0].pk, 1)})
+
+    def test_answer_deleted(self):
+        for member in self.members:
+            answer_poll(member, self.option)
+        PollAnswer.objects.filter(member__in=self.members[:2]).delete()
+        self.assertCounts((1, 0), {(self.option.pk, self.instruments[0].pk, 1)})
+
+    def test_member_changed(self):
+        answer_poll(self.members[0], self.option)
+        self.members[0].instrument = self.instruments[1]
+        self.members[0].save()
+        self.assertCounts((1, 0), {(self.option.pk, self.instruments[1].pk, 1)})
+
+        self.members[0].delete()
+        self.assertCounts((0, 0), set())
+
+    def test_rebuild(self):
+        for member in self.members:
+            answer_poll(member, self.option)
+        counts = self.counts()
+        PollOption.objects.update(vote_count=10)
+        PollInstrumentCount.objects.update(count=10)
+
+        call_command('rebuildpollcounts', stdout=StringIO())
+        self.assertEqual(self.counts(), counts)
+
+
+class PollAnswerTestCase(TestCase):
+    def setUp(self):
+        self.poll = Poll.objects.create(title='Konsert')
+        self.options = [PollOption.objects.create(poll=self.poll, title='Valg %d' % i)
+                        for i in range(10)]
+        self.member = generate_member()
+
+    def test_get_answer(self):
+        self.assertIsNone(get_answer(self.poll, self.member))
+
+        answer_poll(self.member, self.options[3])
+        with self.assertNumQueries(1):
+            self.assertEqual(get_answer(self.poll, self.member), self.options[3])
+
+    def test_change_answer(self):
+        answer_poll(self.member, self.options[0])
+        answer_poll(self.member, self.options[1])
+        answer_poll(self.member, self.options[1])
+
+        self.assertEqual(list(PollAnswer.objects.values_list('member', 'option')),
+                         [(self.member.pk, self.options[1].pk)])
+        self.assertEqual(list(self.options[1].members.all()), [self.member])
+        self.assertEqual(list(self.options[0].members.all()), [])
+
+    def test_poll_from_option(self):
+        other = PollOption.objects.create(poll=Poll.objects.create(title='Annen'), title='Ja')
+        answer = PollAnswer.objects.create(poll=self.poll, member=self.member, option=other)
+        self.assertEqual(answer.poll, other.poll)
+        self.assertIsNone(get_answer(self.poll, self.member))
+
+    def test_past_deadline(self):
+        answer_poll(self.member, self.options[0])
+        self.poll.deadline = timezone.now() - timedelta(minutes=1)
+        self.poll.save()
+
+        with self.assertRaises(ValidationError):
+            answer_poll(self.member, self.options[1])
+        self.assertEqual(get_answer(self.poll, self.member), self.options[0])
+
+        form = PollAnswerForm({'options': self.options[1].pk}, member=self.member, poll=self.poll)
+        self.assertFalse(form.is_valid())
+        form.save(self.member)
+        self.assertEqual(get_answer(self.poll, self.member), self.options[0])
+
+    def test_form(self):
+        answer_poll(self.member, self.options[2])
+        with self.assertNumQueries(1):
+            form = PollAnswerForm(member=self.member, poll=self.poll)
+        self.assertEqual(form.fields['options'].initial, self.options[2])
+
+        form = PollAnswerForm({'options': self.options[5].pk}, member=self.member, poll=self.poll)
+        form.save(self.member)
+        self.assertEqual(get_answer(self.poll, self.member), self.options[5])
+        self.assertEqual(PollAnswer.objects.count(), 1)
+
+
+class PollResultsTestCase(TestCase):
+    def setUp(self):
+        self.poll = Poll.objects.create(title='Konsert')
+        self.yes = PollOption.objects.create(poll=self.poll, title='Ja')
+        self.no = PollOption.objects.create(poll=self.poll, title='Nei')
+        self.member = generate_member()
+
+    def test_view(self):
+        url = reverse('poll_results', args=[self.poll.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(self.member)
+        answer_poll(self.member, self.yes)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['options'], [{
+            'pk': self.yes.pk,
+            'vote_count': 1,
+            'tally': [{'name': self.member.instrument.name, 'count': 1}],
+            'members': [{'pk': self.member.pk, 'name': self.member.get_full_name()}],
+        }, {
+            'pk': self.no.pk,
+            'vote_count': 0,
+            'tally': [],
+            'members': [],
+        }])
+
+        answer_poll(self.member, self.no)
+        options = self.client.get(url).json()['options']
+        self.assertEqual([(option['pk'], option['vote_count']) for option in options],
+                         [(self.yes.pk, 0), (self.no.pk, 1)])
+
+    def test_not_found(self):
+        self.client.force_login(self.member)
+        response = self.client.get(reverse('poll_results', args=[self.poll.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+
+class PollResultsCacheTestCase(TransactionTestCase):
+    # The results are only cached outside of transactions
+
+    def setUp(self):
+        self.poll = Poll.objects.create(title='Konsert')
+        self.yes = PollOption.objects.create(poll=self.poll, title='Ja')
+        self.no = PollOption.objects.create(poll=self.poll, title='Nei')
+        self.member = generate_member()
+
+    def vote_counts(self):
+        return [option['vote_count'] for option in get_cached_results(self.poll.pk)['options']]
+
+    def test_cache(self):
+        self.assertEqual(self.vote_counts(), [0, 0])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.vote_counts(), [0, 0])
+
+        answer_poll(self.member, self.yes)
+        self.assertEqual(self.vote_counts(), [1, 0])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.vote_counts(), [1, 0])
+
+        answer_poll(self.member, self.no)
+        self.assertEqual(self.vote_counts(), [0, 1])
+
+        self.member.first_name = 'Nytt'
+        self.member.save()
+        members = get_cached_results(self.poll.pk)['options'][1]['members']
+        self.assertEqual(members, [{'pk': self.member.pk, 'name': self.member.get_full_name()}])
+
+        PollAnswer.objects.get().delete()
+        self.assertEqual(self.vote_counts(), [0, 0])
+
+    def test_other_poll(self):
+        other = Poll.objects.create(title='Annen')
+        option = PollOption.objects.create(poll=other, title='Ja')
+        self.vote_counts()
+
+        answer_poll(self.member, option)
+        with self.assertNumQueries(0):
+            self.vote_counts()
@@ -3,4 +3,5 @@ from polls import views
 
 urlpatterns = [
     path('<int:pk>', views.PollStatistics.as_view(), name='poll_statistics'),
+    path('<int:pk>/resultater', views.PollResults.as_view(), name='poll_results'),
 ]
@@ -1,9 +1,11 @@
-from django.views.generic import DetailView
+from django.http import Http404, JsonResponse
+from django.views.generic import View, DetailView
 from django.views.generic.detail import SingleObjectMixin
 from django.contrib.auth.mixins import LoginRequiredMixin
 
 from utils.views import MultiFormView
 from .models import Poll
+from .tally import get_tally, get_cached_results
 from .forms import PollForm, PollOptionFormset, PollAnswerForm
 
 
@@ -51,7 +53,48 @@ class PollStatistics(LoginRequiredMixin, DetailView):
     """
     Display information about what people chose
     in a given poll.
+
+    **Context**
+
+    ``poll``
+        The poll.
+
+    ``options``
+        The options of the poll, with the members who chose each option
+        and the number of them per instrument. See ``polls.tally.get_tally()``.
+
+    ``instruments``
+        The instruments of the members who answered the poll.
     """
     model = Poll
     context_object_name = 'poll'
     template_name = 'polls/poll_statistics.html'
+
+    def get_context_data(self, **kwargs):
+        context = super(PollStatistics, self).get_context_data(**kwargs)
+        context.update(get_tally(self.object))
+        return context
+
+
+class PollResults(LoginRequiredMixin, View):
+    """
+    Return the results of a poll as JSON, for
+    :view:`polls.views.PollStatistics` to refresh itself with.
+
+    The statistics page fetches the results every few seconds, so new
+    answers show up after a short delay rather than right away. The
+    results are cached until the answers change, so they are counted once
+    per change for all the open pages.
+
+    **Result**
+
+    ``options``
+        A list with the ``pk``, the ``vote_count``, the ``tally`` and the
+        ``members``, with their ``pk`` and ``name``, of each option.
+        See ``polls.tally.get_results()``.
+    """
+    def get(self, request, pk):
+        try:
+            return JsonResponse(get_cached_results(pk))
+        except Poll.DoesNotExist:
+            raise Http404('Påmeldingen finnes ikke.')
@@ -0,0 +1 @@
+from .versions import *
@@ -0,0 +1,95 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+__all__ = ['get_version', 'bump_version', 'bump_version_on_commit', 'can_cache',
+           'versioned_key']
+
+# The names to bump when the current transaction is committed, per thread
+_pending = threading.local()
+
+
+def _version_key(name):
+    return 'version:%s' % name
+
+
+def _initial_version():
+    # Start from the current time instead of 1, so entries cached under an
+    # old version are never reused if the version itself is evicted.
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    """Return the current version of the cached data with the given name."""
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key, _initial_version())
+    return version
+
+
+def bump_version(name):
+    """
+    Invalidate all cached data with the given name, by incrementing its version.
+
+    The old entries are not deleted, but will never be read again,
+    and will expire by themselves.
+    """
+    key = _version_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), None)
+
+
+def bump_version_on_commit(name):
+    """
+    Invalidate all cached data with the given name now, so the current
+    transaction reads its own changes, and again when the transaction is
+    committed.
+
+    A concurrent request can read the old data from the database before
+    the commit, and cache it under the version bumped inside the
+    transaction, so that version is discarded after the commit.
+
+    The name is bumped once per commit, however many times this is called.
+    """
+    if transaction.get_connection().in_atomic_block:
+        bump_version(name)
+
+    if not hasattr(_pending, 'names'):
+        _pending.names = set()
+    _pending.names.add(name)
+
+    # Every call registers a callback, since the callbacks are dropped if
+    # the transaction is rolled back. The first callback bumps every name.
+    transaction.on_commit(_bump_pending)
+
+
+def _bump_pending():
+    names = getattr(_pending, 'names', None)
+    if not names:
+        return
+
+    _pending.names = set()
+    for name in names:
+        bump_version(name)
+
+
+def can_cache():
+    """
+    Return whether data read from the database can be cached, which it
+    can't inside a transaction, since the transaction could be rolled back.
+    """
+    return not transaction.get_connection().in_atomic_block
+
+
+def versioned_key(name, *parts):
+    """
+    Return a cache key for the data with the given name, including its
+    current version, so that the key changes when the version is bumped.
+    """
+    return ':'.join(map(str, [name, get_version(name), *parts]))
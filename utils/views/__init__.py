@@ -1 +1,2 @@
 from .views import *
+from .responses import *
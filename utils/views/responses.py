@@ -0,0 +1,43 @@
+import csv
+
+from django.http import StreamingHttpResponse
+
+
+__all__ = ['StreamingCSVResponse']
+
+
+class Echo:
+    """A file-like object that returns what is written to it, instead of storing it."""
+    def write(self, value):
+        return value
+
+
+class ExcelDialect(csv.excel):
+    """
+    A CSV dialect that Excel opens directly with a Norwegian locale,
+    where the comma is the decimal separator.
+    """
+    delimiter = ';'
+
+
+class StreamingCSVResponse(StreamingHttpResponse):
+    """
+    Stream the rows from an iterable as a CSV file attachment.
+
+    Each row is encoded as it is sent, so the rows can come straight from
+    a database cursor without holding the whole file in memory. With
+    ``excel`` the file starts with a byte order mark and uses semicolons
+    as separators, so Excel reads the encoding and the columns correctly.
+    """
+    def __init__(self, rows, filename, excel=False, **kwargs):
+        kwargs.setdefault('content_type', 'text/csv; charset=utf-8')
+        writer = csv.writer(Echo(), dialect=ExcelDialect if excel else csv.excel)
+        super().__init__(self.stream(writer, rows, excel), **kwargs)
+        self['Content-Disposition'] = 'attachment; filename="%s.csv"' % filename
+
+    @staticmethod
+    def stream(writer, rows, excel):
+        if excel:
+            yield '\ufeff'
+        for row in rows:
+            yield writer.writerow(row)